@@ -1,8 +1,10 @@
 import streamlit as st
+import streamlit.components.v1 as components
 import os
 import json
-from research_agent import get_company_data
-from pdf_generator import create_styled_pdf
+from research_agent import stream_company_data
+from pdf_generator import render_pdf_bytes, render_preview
+from render_pool import get_shared_pool
 
 # PAGE CONFIGURATION
 st.set_page_config(
@@ -46,21 +48,55 @@ def get_clean_val(data, default="Unknown"):
         return data.get('value', default)
     return str(data) if data else default
 
+# Look for logo file in current directory or assets folder
+LOGO_PATHS = [
+    'workshop_logo.png',
+    'assets/workshop_logo.png',
+    'workshop_logo_full.png'
+]
+
+def find_logo_path():
+    """Returns the first logo file that exists, or None"""
+    for path in LOGO_PATHS:
+        if os.path.exists(path):
+            return path
+    return None
+
+def get_pdf_pool():
+    """Warm render pool shared by every session; None renders in-process"""
+    try:
+        return get_shared_pool()
+    except Exception as e:
+        print(f"⚠️ PDF render pool unavailable, rendering in-process: {e}")
+        return None
+
+# STREAMING PROGRESS MESSAGES (one per profile section)
+SECTION_PROGRESS = {
+    'snapshot': lambda v: f"🏢 Snapshot ready: {v.get('industry', 'Unknown')} • {v.get('location', 'Unknown')}",
+    'openers': lambda v: f"⚡ {len(v)} call scripts drafted",
+    'why_now': lambda v: "🧠 'Why Now' hooks: " + ", ".join(i.get('title', 'Insight') for i in v[:2]),
+    'personas': lambda v: "👤 Decision makers: " + ", ".join(p.get('name', 'Unknown') for p in v[:2]),
+    'angles': lambda v: f"🎯 {len(v)} messaging angles identified",
+}
+
 st.title("🚀 Workshop ABM One-Pager Generator")
 st.markdown("Generate hyper-personalized BDR assets powered by live research + AI")
 
 # SIDEBAR
 with st.sidebar:
     st.header("🔧 System Status")
-    if os.environ.get("TAVILY_API_KEY"):
-        st.success("✓ Tavily Search Active")
+    if os.environ.get("RESEARCH_PROVIDER", "").lower() == "fake":
+        st.warning("⚙️ Offline Mode - Canned Research Data")
     else:
-        st.error("✗ Tavily Key Missing")
-        
-    if os.environ.get("ANTHROPIC_API_KEY"):
-        st.success("✓ Claude AI Active")
-    else:
-        st.error("✗ Anthropic Key Missing")
+        if os.environ.get("TAVILY_API_KEY"):
+            st.success("✓ Tavily Search Active")
+        else:
+            st.error("✗ Tavily Key Missing")
+            
+        if os.environ.get("ANTHROPIC_API_KEY"):
+            st.success("✓ Claude AI Active")
+        else:
+            st.error("✗ Anthropic Key Missing")
     
     st.divider()
     st.info("**How it works:**\n\n1. Deep searches for Fiscal Year, Tech Stack, & Strategic Shifts\n2. Finds Internal Comms leaders & Verified Emails\n3. Generates clickable PDF with Source Links")
@@ -85,16 +121,18 @@ if st.button("🔍 Generate Strategy", type="primary"):
         try:
             status_box.write("🕵️ Hunting for strategic initiatives & fiscal data...")
             
-            # Get structured data from research agent
-            structured_data = get_company_data(company_name, website)
-            
-            status_box.write("👤 Verifying internal comms decision makers...")
-            status_box.write("🧠 Synthesizing 'Why Now' hooks...")
-            status_box.write("📄 Rendering interactive PDF...")
+            # Stream structured data from research agent, reporting each section as it lands
+            structured_data = None
+            for section, value in stream_company_data(company_name, website):
+                if section == 'complete':
+                    structured_data = value
+                elif section in SECTION_PROGRESS:
+                    status_box.write(SECTION_PROGRESS[section](value))
             
             # Store in session state
             st.session_state['structured_data'] = structured_data
             st.session_state['company_name'] = company_name
+            st.session_state.pop('pdf_bytes', None)
             
             status_box.update(label="✅ Analysis Complete!", state="complete", expanded=False)
             
@@ -114,9 +152,18 @@ if 'structured_data' in st.session_state:
     # Tabs for different views
     tab1, tab2, tab3 = st.tabs(["📄 Preview", "🔍 Data Inspection", "📥 Export"])
     
+    logo_path = find_logo_path()
+    
     with tab1:
+        # Layout preview: the one-pager's own HTML, no PDF render needed
+        try:
+            preview = render_preview(data, company, logo_path=logo_path)
+            components.html(preview['html'], height=1100, scrolling=True)
+        except Exception as e:
+            st.warning(f"Layout preview unavailable: {str(e)}")
+        
         # Section 1: Snapshot
-        with st.expander("🏢 Company Snapshot", expanded=True):
+        with st.expander("🏢 Company Snapshot", expanded=False):
             snapshot = data.get('snapshot', {})
             
             col1, col2 = st.columns(2)
@@ -141,14 +188,14 @@ if 'structured_data' in st.session_state:
                 st.markdown(" • ".join(tools))
         
         # Section 2: Call Scripts (NEW)
-        with st.expander("⚡ Call Scripts (Openers)", expanded=True):
+        with st.expander("⚡ Call Scripts (Openers)", expanded=False):
             openers = data.get('openers', [])
             for op in openers:
                 st.markdown(f"**{op.get('label', 'Opener')}**")
                 st.info(f'"{op.get("script", "")}"')
 
         # Section 3: Why Now
-        with st.expander("🚀 Why Now (Strategic)", expanded=True):
+        with st.expander("🚀 Why Now (Strategic)", expanded=False):
             why_now = data.get('why_now', [])
             for item in why_now:
                 title = item.get('title', 'Insight')
@@ -161,7 +208,7 @@ if 'structured_data' in st.session_state:
                 st.markdown("---")
         
         # Section 4: Personas
-        with st.expander("👥 Key Decision Makers", expanded=True):
+        with st.expander("👥 Key Decision Makers", expanded=False):
             personas = data.get('personas', [])
             for p in personas:
                 name = p.get('name', 'Unknown')
@@ -199,29 +246,22 @@ if 'structured_data' in st.session_state:
             """)
         
         with col2:
-            # Generate PDF
+            # Generate PDF only when asked for (render is cached per profile)
             try:
-                # Look for logo file in current directory or assets folder
-                logo_path = None
-                possible_paths = [
-                    'workshop_logo.png',
-                    'assets/workshop_logo.png',
-                    'workshop_logo_full.png'
-                ]
-                for path in possible_paths:
-                    if os.path.exists(path):
-                        logo_path = path
-                        break
-                
-                pdf_data = create_styled_pdf(data, company, logo_path=logo_path)
+                if 'pdf_bytes' not in st.session_state:
+                    if st.button("📄 Prepare PDF", type="primary"):
+                        with st.spinner("Rendering PDF..."):
+                            pdf_data = render_pdf_bytes(data, company, logo_path=logo_path, pool=get_pdf_pool())
+                            st.session_state['pdf_bytes'] = pdf_data
                 
-                st.download_button(
-                    label="📄 Download PDF",
-                    data=pdf_data,
-                    file_name=f"Workshop_ABM_{company.replace(' ', '_')}.pdf",
-                    mime="application/pdf",
-                    type="primary"
-                )
+                if 'pdf_bytes' in st.session_state:
+                    st.download_button(
+                        label="📄 Download PDF",
+                        data=st.session_state['pdf_bytes'],
+                        file_name=f"Workshop_ABM_{company.replace(' ', '_')}.pdf",
+                        mime="application/pdf",
+                        type="primary"
+                    )
                 
             except Exception as e:
                 st.error(f"PDF generation failed: {str(e)}")
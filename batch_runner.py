@@ -0,0 +1,239 @@
+"""
+Batch Runner - Headless research + PDF generation for a CSV of accounts
+
+Usage:
+    python batch_runner.py accounts.csv --out output/ --research-workers 4 --pdf-workers 2
+
+The CSV needs `company` and `website` columns. For each row the runner writes
+`<slug>.json` (research) and `<slug>.pdf` (one-pager) into the output
+directory. Both files are written atomically, so a re-run after a crash skips
+accounts whose PDF already exists and re-renders accounts that only got as far
+as research. Accounts whose research returned no sources or only the
+placeholder profile are counted as failed and nothing is saved for them, so
+the next run researches them again.
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import uuid
+import queue
+import argparse
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+DEFAULT_LOGO_PATH = 'assets/workshop_logo.png'
+
+
+def slugify(company_name):
+    return re.sub(r'[^A-Za-z0-9]+', '_', company_name).strip('_') or 'account'
+
+
+def read_accounts(csv_path):
+    """Reads (company, website) rows, skipping blanks and duplicate companies"""
+    accounts = []
+    seen = set()
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            company = (row.get('company') or '').strip()
+            website = (row.get('website') or '').strip()
+            if not company or not website:
+                continue
+            slug = slugify(company)
+            if slug in seen:
+                continue
+            seen.add(slug)
+            accounts.append({'company': company, 'website': website, 'slug': slug})
+    return accounts
+
+
+def write_atomic(path, data, mode='wb'):
+    """Writes to a uniquely named temp file beside `path`, then renames it into place"""
+    tmp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+    try:
+        with open(tmp_path, mode) as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def research_account(account, json_path):
+    """
+    Network-bound stage: runs get_company_data and saves the profile.
+
+    Raises RuntimeError (without writing the JSON) when research came back
+    as the placeholder profile, so the account is retried on the next run.
+
+    Returns:
+        json_path; the profile itself is left for the render worker to read
+    """
+    from research_agent import get_company_data
+    from profile_parser import PROFILE_SECTIONS
+
+    structured_data = get_company_data(account['company'], account['website'])
+    metadata = structured_data.get('_metadata', {})
+    if metadata.get('fallback') or set(PROFILE_SECTIONS) <= set(metadata.get('failed_sections') or []):
+        raise RuntimeError("synthesis failed for every section; got a placeholder profile")
+    if not metadata.get('sources_count'):
+        raise RuntimeError("no search results (all queries failed)")
+    write_atomic(json_path, json.dumps(structured_data, indent=2), mode='w')
+    return json_path
+
+
+def run_batch(accounts, out_dir, research_workers=4, pdf_workers=2, logo_path=DEFAULT_LOGO_PATH,
+              pdf_timeout=None, jobs_per_worker=None, optimize_pdf=None):
+    """
+    Researches and renders every account, pipelining the two stages.
+
+    Args:
+        accounts: List of {'company', 'website', 'slug'} dicts
+        out_dir: Directory for the JSON and PDF outputs
+        research_workers: Concurrent get_company_data calls (threads)
+        pdf_workers: Warm PDF render processes (see render_pool.RenderPool)
+        logo_path: Logo passed to create_styled_pdf
+        pdf_timeout: Seconds one render may take before its worker is killed
+        jobs_per_worker: Renders before a PDF worker is replaced
+        optimize_pdf: Optimize images and shrink the logo (default: PDF_OPTIMIZE)
+
+    Returns:
+        Dict with 'succeeded', 'skipped' and 'failed' lists of company names
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    if logo_path and not os.path.exists(logo_path):
+        logo_path = None
+
+    summary = {'succeeded': [], 'skipped': [], 'failed': []}
+    to_research = []
+    to_render = []
+
+    for account in accounts:
+        json_path = os.path.join(out_dir, f"{account['slug']}.json")
+        pdf_path = os.path.join(out_dir, f"Workshop_ABM_{account['slug']}.pdf")
+        account = dict(account, json_path=json_path, pdf_path=pdf_path)
+        if os.path.exists(pdf_path):
+            summary['skipped'].append(account['company'])
+        elif os.path.exists(json_path):
+            to_render.append(account)
+        else:
+            to_research.append(account)
+
+    print(f"📋 {len(accounts)} accounts: {len(summary['skipped'])} done, "
+          f"{len(to_render)} to render, {len(to_research)} to research")
+
+    if not to_research and not to_render:
+        return summary
+
+    from render_pool import RenderPool
+
+    # Only a window of research jobs is in flight at once, and every future is
+    # dropped as soon as it is handled, so memory stays flat however many
+    # accounts the CSV holds. Profiles travel to the render workers as paths.
+    research_window = 2 * max(1, research_workers)
+    remaining = iter(to_research)
+
+    with ThreadPoolExecutor(max_workers=max(1, research_workers)) as research_pool, \
+            RenderPool(workers=pdf_workers, logo_path=logo_path, job_timeout=pdf_timeout,
+                       max_jobs_per_worker=jobs_per_worker, optimized=optimize_pdf) as pdf_pool:
+
+        research_futures = {}
+        render_futures = {}
+        # Accounts with a saved profile waiting for a free render slot
+        ready = deque(to_render)
+
+        def top_up_research():
+            while len(research_futures) < research_window:
+                account = next(remaining, None)
+                if account is None:
+                    return
+                future = research_pool.submit(research_account, account, account['json_path'])
+                research_futures[future] = account
+
+        def feed_renders():
+            # Never blocks while other work is in flight, so a backlog of
+            # resumed renders can't stall the research stage
+            while ready:
+                account = ready[0]
+                idle = not research_futures and not render_futures
+                try:
+                    future = pdf_pool.submit_profile(account['json_path'], account['company'],
+                                                     out_path=account['pdf_path'],
+                                                     timeout=None if idle else 0)
+                except queue.Full:
+                    return
+                except Exception as e:
+                    print(f"❌ Could not queue PDF for {account['company']}: {e}")
+                    summary['failed'].append(account['company'])
+                else:
+                    render_futures[future] = account
+                ready.popleft()
+
+        top_up_research()
+        feed_renders()
+
+        while research_futures or render_futures:
+            done, _ = wait(list(research_futures) + list(render_futures), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in research_futures:
+                    account = research_futures.pop(future)
+                    try:
+                        future.result()
+                    except Exception as e:
+                        print(f"❌ Research failed for {account['company']}: {e}")
+                        summary['failed'].append(account['company'])
+                    else:
+                        ready.append(account)
+                else:
+                    account = render_futures.pop(future)
+                    try:
+                        future.result()
+                        print(f"📄 {account['company']} -> {account['pdf_path']}")
+                        summary['succeeded'].append(account['company'])
+                    except Exception as e:
+                        print(f"❌ PDF generation failed for {account['company']}: {e}")
+                        summary['failed'].append(account['company'])
+            top_up_research()
+            feed_renders()
+
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate Workshop ABM one-pagers for a CSV of accounts")
+    parser.add_argument('csv_path', help="CSV with 'company' and 'website' columns")
+    parser.add_argument('--out', default='output', help="Output directory (default: output)")
+    parser.add_argument('--research-workers', type=int, default=4,
+                        help="Accounts researched concurrently (default: 4)")
+    parser.add_argument('--pdf-workers', type=int, default=os.cpu_count() or 2,
+                        help="PDF render processes (default: CPU count)")
+    parser.add_argument('--logo', default=DEFAULT_LOGO_PATH, help="Logo image for the PDF header")
+    parser.add_argument('--pdf-timeout', type=float, default=None,
+                        help="Seconds a single PDF render may take (default: PDF_JOB_TIMEOUT or 120)")
+    parser.add_argument('--jobs-per-worker', type=int, default=None,
+                        help="Renders before a PDF worker process is recycled (default: PDF_WORKER_MAX_JOBS or 100)")
+    parser.add_argument('--optimize-pdf', action='store_true', default=None,
+                        help="Optimize images and embed a display-sized logo for smaller PDFs")
+    args = parser.parse_args(argv)
+
+    accounts = read_accounts(args.csv_path)
+    summary = run_batch(
+        accounts, args.out,
+        research_workers=args.research_workers,
+        pdf_workers=args.pdf_workers,
+        logo_path=args.logo,
+        pdf_timeout=args.pdf_timeout,
+        jobs_per_worker=args.jobs_per_worker,
+        optimize_pdf=args.optimize_pdf
+    )
+
+    print(f"✅ {len(summary['succeeded'])} generated, {len(summary['skipped'])} skipped, "
+          f"{len(summary['failed'])} failed")
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+"""
+Benchmark - Deterministic pipeline benchmarks from recorded cassettes
+
+Record a corpus once (uses the live APIs):
+    python benchmark.py record accounts.csv --out cassettes/
+
+Replay it through research -> feature match -> PDF with no network:
+    python benchmark.py run cassettes/ --latency recorded --workers 4
+
+The run reports throughput and per-stage latency percentiles built from the
+instrumentation spans.
+"""
+
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_runner import read_accounts, DEFAULT_LOGO_PATH
+from cassettes import Cassette, recording, replaying
+from instrumentation import span
+from research_agent import get_company_data
+from workshop_features import match_features_to_company
+
+try:
+    from pdf_generator import create_styled_pdf
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+    print("⚠️ weasyprint not available - PDF stage will be skipped")
+
+
+def percentile(values, q):
+    """Linear-interpolated percentile (q in 0-100) of a non-empty list"""
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * q / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def record_corpus(csv_path, out_dir, force=False):
+    """Researches each account live, saving one cassette per account"""
+    for account in read_accounts(csv_path):
+        path = os.path.join(out_dir, f"{account['slug']}.json")
+        if os.path.exists(path) and not force:
+            print(f"⏭️ {account['company']} already recorded")
+            continue
+        with recording(path, account['company'], account['website']):
+            get_company_data(account['company'], account['website'])
+
+
+def run_account(account, render_pdf, logo_path):
+    """Runs one account through the full pipeline, returning its trace timings"""
+    with span("benchmark_account", company=account['company']) as trace:
+        structured_data = get_company_data(account['company'], account['website'])
+        match_features_to_company(structured_data)
+        if render_pdf:
+            create_styled_pdf(structured_data, account['company'], logo_path=logo_path)
+        total_ms = trace.elapsed_ms()
+    return total_ms, list(trace.spans)
+
+
+def run_benchmark(cassette_paths, latency=None, strict=True, workers=1, repeat=1,
+                  render_pdf=True, logo_path=DEFAULT_LOGO_PATH):
+    """
+    Replays every recorded account `repeat` times and aggregates timings.
+
+    Returns:
+        Report dict with throughput and per-stage latency percentiles (ms)
+    """
+    accounts = [Cassette.load(path).account for path in cassette_paths]
+    accounts = [a for a in accounts if a.get('company') and a.get('website')] * repeat
+    render_pdf = render_pdf and PDF_AVAILABLE
+    if logo_path and not os.path.exists(logo_path):
+        logo_path = None
+
+    stage_samples = {}
+    totals = []
+    failures = 0
+    start = time.perf_counter()
+    with replaying(cassette_paths, latency=latency, strict=strict):
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            futures = [pool.submit(run_account, a, render_pdf, logo_path) for a in accounts]
+            for future in futures:
+                try:
+                    total_ms, spans = future.result()
+                except Exception as e:
+                    print(f"❌ Replay failed: {e}")
+                    failures += 1
+                    continue
+                totals.append(total_ms)
+                for s in spans:
+                    stage_samples.setdefault(s['name'], []).append(s['duration_ms'])
+    wall_seconds = time.perf_counter() - start
+
+    def describe(samples):
+        return {
+            'count': len(samples),
+            'mean_ms': round(sum(samples) / len(samples), 2),
+            'p50_ms': round(percentile(samples, 50), 2),
+            'p95_ms': round(percentile(samples, 95), 2),
+            'max_ms': round(max(samples), 2),
+        }
+
+    completed = len(totals)
+    return {
+        'accounts': completed,
+        'failures': failures,
+        'workers': workers,
+        'latency': latency,
+        'pdf_rendered': render_pdf,
+        'wall_seconds': round(wall_seconds, 3),
+        'accounts_per_minute': round(completed / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        'account_latency': describe(totals) if totals else {},
+        'stages': {name: describe(samples) for name, samples in sorted(stage_samples.items())},
+    }
+
+
+def print_report(report):
+    print(f"\n📊 {report['accounts']} accounts in {report['wall_seconds']}s "
+          f"({report['accounts_per_minute']}/min, {report['workers']} workers, {report['failures']} failed)")
+    if report['account_latency']:
+        a = report['account_latency']
+        print(f"   per account: p50 {a['p50_ms']}ms  p95 {a['p95_ms']}ms  max {a['max_ms']}ms")
+    print(f"\n   {'stage':<28}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+    for name, stats in report['stages'].items():
+        print(f"   {name:<28}{stats['count']:>7}{stats['p50_ms']:>11}{stats['p95_ms']:>11}{stats['max_ms']:>11}")
+
+
+def parse_latency(value):
+    if value in (None, 'none', '0'):
+        return None
+    if value == 'recorded':
+        return value
+    return float(value)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record and replay ABM pipeline benchmarks")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    rec = sub.add_parser('record', help="Record cassettes for a CSV of accounts (live APIs)")
+    rec.add_argument('csv_path')
+    rec.add_argument('--out', default='cassettes')
+    rec.add_argument('--force', action='store_true', help="Re-record existing cassettes")
+
+    run = sub.add_parser('run', help="Replay a cassette corpus and report timings")
+    run.add_argument('corpus', help="Directory of cassette .json files")
+    run.add_argument('--latency', default=None,
+                     help="'recorded', seconds per call, or omit for instant replay")
+    run.add_argument('--loose', action='store_true',
+                     help="Replay LLM output even if the research context changed")
+    run.add_argument('--workers', type=int, default=1)
+    run.add_argument('--repeat', type=int, default=1)
+    run.add_argument('--skip-pdf', action='store_true')
+    run.add_argument('--json', dest='json_path', help="Also write the report to this file")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'record':
+        record_corpus(args.csv_path, args.out, force=args.force)
+        return 0
+
+    paths = sorted(glob.glob(os.path.join(args.corpus, '*.json')))
+    if not paths:
+        print(f"❌ No cassettes found in {args.corpus}")
+        return 1
+    report = run_benchmark(
+        paths,
+        latency=parse_latency(args.latency),
+        strict=not args.loose,
+        workers=args.workers,
+        repeat=args.repeat,
+        render_pdf=not args.skip_pdf,
+    )
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['failures'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,302 @@
+"""
+Cassettes - Record and replay search/LLM traffic for deterministic runs
+
+Recording wraps the active providers and captures every search response
+and LLM response made during get_company_data into a versioned JSON file.
+Replaying serves those responses back with no network, optionally sleeping
+for the recorded (or a fixed) latency so benchmarks stay realistic.
+
+    with recording('cassettes/acme.json', 'Acme', 'acme.com'):
+        get_company_data('Acme', 'acme.com')
+
+    with replaying(['cassettes/acme.json'], latency='recorded'):
+        get_company_data('Acme', 'acme.com')
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import providers
+from providers import SearchProvider, SynthesisProvider
+from research_cache import hash_key, normalize_query, set_caches_enabled
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(KeyError):
+    """Raised on replay when a request was never recorded"""
+
+
+def search_key(query, search_depth, max_results):
+    return hash_key('search', normalize_query(query), search_depth, max_results)
+
+
+def synthesis_key(system_prompt, user_prompt, inputs):
+    return hash_key('synthesis', system_prompt, user_prompt.format(**inputs))
+
+
+def loose_synthesis_key(system_prompt, inputs):
+    """Ignores the research context, so replays survive context-builder tuning"""
+    return hash_key('synthesis-loose', system_prompt, inputs.get('company_name'), inputs.get('website'))
+
+
+class Cassette:
+    """In-memory set of recorded interactions, saved as one JSON file per account"""
+
+    def __init__(self, account=None, model_name=None):
+        self.account = account or {}
+        self.model_name = model_name
+        self.recorded_at = datetime.now(timezone.utc).isoformat()
+        self.searches = {}
+        self.syntheses = {}
+        self._loose_index = {}
+        self._lock = threading.Lock()
+
+    def add_search(self, query, search_depth, max_results, results, elapsed):
+        with self._lock:
+            self.searches[search_key(query, search_depth, max_results)] = {
+                'query': normalize_query(query),
+                'search_depth': search_depth,
+                'max_results': max_results,
+                'results': results,
+                'elapsed': round(elapsed, 4),
+            }
+
+    def add_synthesis(self, system_prompt, user_prompt, inputs, output, elapsed):
+        key = synthesis_key(system_prompt, user_prompt, inputs)
+        loose_key = loose_synthesis_key(system_prompt, inputs)
+        with self._lock:
+            self.syntheses[key] = {
+                'loose_key': loose_key,
+                'output': output,
+                'elapsed': round(elapsed, 4),
+            }
+            self._loose_index[loose_key] = key
+
+    def find_synthesis(self, system_prompt, user_prompt, inputs, strict=True):
+        """Exact match on the full prompt; with strict=False, fall back to prompt + account"""
+        entry = self.syntheses.get(synthesis_key(system_prompt, user_prompt, inputs))
+        if entry is None and not strict:
+            key = self._loose_index.get(loose_synthesis_key(system_prompt, inputs))
+            entry = self.syntheses.get(key)
+        return entry
+
+    def _reindex(self):
+        self._loose_index = {
+            entry['loose_key']: key for key, entry in self.syntheses.items() if entry.get('loose_key')
+        }
+
+    def merge(self, other):
+        self.searches.update(other.searches)
+        self.syntheses.update(other.syntheses)
+        self.model_name = self.model_name or other.model_name
+        self._reindex()
+
+    def save(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        payload = {
+            'version': CASSETTE_VERSION,
+            'recorded_at': self.recorded_at,
+            'account': self.account,
+            'model_name': self.model_name,
+            'searches': self.searches,
+            'syntheses': self.syntheses,
+        }
+        tmp_path = f"{path}.{uuid.uuid4().hex[:12]}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            payload = json.load(f)
+        version = payload.get('version')
+        if version != CASSETTE_VERSION:
+            raise ValueError(f"Cassette {path} is version {version}, expected {CASSETTE_VERSION} - re-record it")
+        cassette = cls(payload.get('account'), payload.get('model_name'))
+        cassette.recorded_at = payload.get('recorded_at')
+        cassette.searches = payload.get('searches', {})
+        cassette.syntheses = payload.get('syntheses', {})
+        cassette._reindex()
+        return cassette
+
+
+# --- RECORDING ---
+
+class RecordingSearchProvider(SearchProvider):
+    name = "recording"
+
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+
+    def search(self, query, search_depth="advanced", max_results=5):
+        start = time.perf_counter()
+        results = self.inner.search(query, search_depth=search_depth, max_results=max_results)
+        self.cassette.add_search(query, search_depth, max_results, results, time.perf_counter() - start)
+        return results
+
+
+class RecordingSynthesisProvider(SynthesisProvider):
+    name = "recording"
+
+    def __init__(self, inner, cassette):
+        self.inner = inner
+        self.cassette = cassette
+        self.model_name = inner.model_name
+
+    def synthesize(self, system_prompt, user_prompt, inputs):
+        start = time.perf_counter()
+        output = self.inner.synthesize(system_prompt, user_prompt, inputs)
+        self.cassette.add_synthesis(system_prompt, user_prompt, inputs, output, time.perf_counter() - start)
+        return output
+
+    def stream(self, system_prompt, user_prompt, inputs):
+        start = time.perf_counter()
+        chunks = []
+        for chunk in self.inner.stream(system_prompt, user_prompt, inputs):
+            chunks.append(chunk)
+            yield chunk
+        self.cassette.add_synthesis(system_prompt, user_prompt, inputs, ''.join(chunks),
+                                    time.perf_counter() - start)
+
+
+# --- REPLAY ---
+
+def _replay_delay(latency, recorded):
+    if latency == 'recorded':
+        return recorded or 0.0
+    return float(latency or 0.0)
+
+
+class ReplaySearchProvider(SearchProvider):
+    """
+    Serves recorded search results.
+
+    `latency` is None (instant), 'recorded' (sleep for the recorded time),
+    or a fixed number of seconds per call.
+    """
+
+    name = "replay"
+
+    def __init__(self, cassette, latency=None):
+        self.cassette = cassette
+        self.latency = latency
+
+    def search(self, query, search_depth="advanced", max_results=5):
+        entry = self.cassette.searches.get(search_key(query, search_depth, max_results))
+        if entry is None:
+            raise CassetteMiss(f"No recorded search for: {normalize_query(query)[:80]}")
+        delay = _replay_delay(self.latency, entry.get('elapsed'))
+        if delay:
+            time.sleep(delay)
+        return entry['results']
+
+
+class ReplaySynthesisProvider(SynthesisProvider):
+    """
+    Serves recorded LLM outputs; see ReplaySearchProvider for `latency`.
+
+    With strict=False a prompt whose research context changed (e.g. while
+    tuning the context builder) still replays the account's recorded output.
+    """
+
+    name = "replay"
+
+    def __init__(self, cassette, latency=None, strict=True, chunk_size=40):
+        self.cassette = cassette
+        self.latency = latency
+        self.strict = strict
+        self.chunk_size = chunk_size
+        self.model_name = cassette.model_name or "replay"
+
+    def _entry(self, system_prompt, user_prompt, inputs):
+        entry = self.cassette.find_synthesis(system_prompt, user_prompt, inputs, strict=self.strict)
+        if entry is None:
+            raise CassetteMiss(f"No recorded synthesis for {inputs.get('company_name', 'unknown account')}")
+        return entry
+
+    def synthesize(self, system_prompt, user_prompt, inputs):
+        entry = self._entry(system_prompt, user_prompt, inputs)
+        delay = _replay_delay(self.latency, entry.get('elapsed'))
+        if delay:
+            time.sleep(delay)
+        return entry['output']
+
+    def stream(self, system_prompt, user_prompt, inputs):
+        entry = self._entry(system_prompt, user_prompt, inputs)
+        text = entry['output']
+        chunks = [text[i:i + self.chunk_size] for i in range(0, len(text), self.chunk_size)] or ['']
+        delay = _replay_delay(self.latency, entry.get('elapsed'))
+        for chunk in chunks:
+            if delay:
+                time.sleep(delay / len(chunks))
+            yield chunk
+
+
+# --- CONTEXT MANAGERS ---
+
+@contextmanager
+def _swapped_providers(search_provider, synthesis_provider):
+    caches_were_enabled = set_caches_enabled(False)
+    previous = providers.set_providers(search_provider, synthesis_provider)
+    try:
+        yield
+    finally:
+        providers.set_providers(*previous)
+        set_caches_enabled(caches_were_enabled)
+
+
+@contextmanager
+def recording(path, company_name=None, website_url=None):
+    """
+    Records every provider call made inside the block into a cassette at `path`.
+
+    Caches are bypassed while recording so each request reaches the provider.
+    """
+    search = providers.get_search_provider()
+    synthesis = providers.get_synthesis_provider()
+    cassette = Cassette({'company': company_name, 'website': website_url}, synthesis.model_name)
+    with _swapped_providers(RecordingSearchProvider(search, cassette),
+                            RecordingSynthesisProvider(synthesis, cassette)):
+        yield cassette
+    cassette.save(path)
+    print(f"📼 Recorded {len(cassette.searches)} searches, {len(cassette.syntheses)} syntheses -> {path}")
+
+
+def load_cassettes(paths):
+    """Loads and merges cassettes; returns (merged_cassette, list_of_cassettes)"""
+    loaded = [Cassette.load(path) for path in paths]
+    merged = Cassette()
+    for cassette in loaded:
+        merged.merge(cassette)
+    return merged, loaded
+
+
+@contextmanager
+def replaying(paths, latency=None, strict=True):
+    """
+    Serves provider calls inside the block from the given cassette files.
+
+    Args:
+        paths: Cassette file paths (merged, so a whole corpus can replay at once)
+        latency: None, 'recorded', or fixed seconds per call
+        strict: Require an exact prompt match for LLM responses
+    """
+    merged, _ = load_cassettes(paths)
+    with _swapped_providers(ReplaySearchProvider(merged, latency),
+                            ReplaySynthesisProvider(merged, latency, strict=strict)):
+        yield merged
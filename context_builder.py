@@ -0,0 +1,327 @@
+"""
+Context Builder - Assembles the research context sent to the LLM
+
+Merges sources that share a URL across queries, collapses near-duplicate
+snippets, keeps the snippets most relevant to each extraction target, and
+trims the lowest-value sources until the context fits a token budget.
+"""
+
+import os
+import re
+from urllib.parse import urlsplit
+
+try:
+    import numpy as np
+    RANKING_AVAILABLE = True
+except ImportError:
+    RANKING_AVAILABLE = False
+    print("⚠️ numpy not installed - relevance ranking disabled")
+
+CONTEXT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "10000"))
+
+# Snippets kept per extraction section by the relevance ranker
+SECTION_TOP_K = int(os.environ.get("SECTION_TOP_K", "6"))
+
+# Jaccard similarity of word shingles above which two snippets are "the same"
+NEAR_DUPLICATE_THRESHOLD = 0.85
+SHINGLE_SIZE = 3
+
+# Rough chars-per-token ratio for English prose
+CHARS_PER_TOKEN = 4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_url(url):
+    """Canonical form for duplicate detection: no scheme, www., fragment or trailing slash"""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc[4:] if parts.netloc.startswith('www.') else parts.netloc
+    path = parts.path.rstrip('/')
+    query = f"?{parts.query}" if parts.query else ''
+    return f"{host}{path}{query}"
+
+
+def _shingles(text):
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def _jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _absorb(target, other):
+    """Folds `other` into `target`, keeping the richer content and every query_type tag"""
+    for query_type in other['query_types']:
+        if query_type not in target['query_types']:
+            target['query_types'].append(query_type)
+    if len(other.get('content', '')) > len(target.get('content', '')):
+        target['content'] = other['content']
+    target['score'] = max(target.get('score') or 0.0, other.get('score') or 0.0)
+
+
+def merge_duplicate_sources(sources):
+    """
+    Merges sources that point at the same URL.
+
+    Returns:
+        New list of source dicts in first-seen order. Each carries a
+        `query_types` list with every query that surfaced it; `query_type`
+        stays the first one for compatibility.
+    """
+    merged = []
+    by_url = {}
+    for source in sources:
+        record = dict(source)
+        record['query_types'] = list(source.get('query_types') or [source.get('query_type')])
+        key = normalize_url(record.get('url'))
+        if key and key in by_url:
+            _absorb(by_url[key], record)
+            continue
+        if key:
+            by_url[key] = record
+        merged.append(record)
+    return merged
+
+
+def collapse_near_duplicates(sources, threshold=NEAR_DUPLICATE_THRESHOLD):
+    """Drops sources whose snippet is nearly identical to an earlier one"""
+    kept = []
+    kept_shingles = []
+    for source in sources:
+        shingles = _shingles(source.get('content', ''))
+        for idx, existing in enumerate(kept_shingles):
+            if _jaccard(shingles, existing) >= threshold:
+                _absorb(kept[idx], source)
+                break
+        else:
+            kept.append(source)
+            kept_shingles.append(shingles)
+    return kept
+
+
+# --- RELEVANCE RANKING ---
+
+# Target vocabulary per extraction section of the synthesis prompt, plus the
+# query types whose sources are expected to feed it
+SECTION_TARGETS = {
+    'snapshot': {
+        'terms': ['headquarters', 'headquartered', 'employees', 'employee', 'workforce', 'fiscal',
+                  'year', 'ends', 'financial', 'calendar', 'investor', 'relations', 'annual',
+                  'report', 'revenue', 'industry', 'founded', 'locations'],
+        'query_types': ['general'],
+    },
+    'tech_stack': {
+        'terms': ['workday', 'microsoft', 'teams', 'sharepoint', 'slack', 'ukg', 'hris', 'adp',
+                  'okta', 'outlook', 'intranet', 'software', 'platform', 'stack', 'administrator',
+                  'job', 'description', 'experience', 'requirements'],
+        'query_types': ['tech'],
+    },
+    'why_now': {
+        'terms': ['strategy', 'strategic', 'plan', 'transformation', 'digital', 'expansion',
+                  'expand', 'acquisition', 'acquire', 'merger', 'restructuring', 'capital',
+                  'project', 'projects', 'markets', 'announced', 'announces', 'growth', 'launch'],
+        'query_types': ['strategy'],
+    },
+    'personas': {
+        'terms': ['director', 'head', 'vp', 'vice', 'president', 'chief', 'officer', 'manager',
+                  'communications', 'comms', 'internal', 'corporate', 'affairs', 'employee',
+                  'experience', 'linkedin'],
+        'query_types': ['people_internal', 'people_corporate', 'people_linkedin'],
+    },
+    'culture': {
+        'terms': ['glassdoor', 'rating', 'culture', 'reviews', 'benefits', 'perks', 'sentiment',
+                  'engagement', 'best', 'places', 'work', 'employees'],
+        'query_types': ['culture'],
+    },
+}
+
+# Multiplier applied when a source came from a query aimed at the section
+QUERY_TYPE_BOOST = 1.5
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+def _build_section_weights():
+    """Vocabulary index and (terms x sections) 0/1 weight matrix, built once"""
+    vocab = {}
+    for target in SECTION_TARGETS.values():
+        for term in target['terms']:
+            vocab.setdefault(term, len(vocab))
+    weights = np.zeros((len(vocab), len(SECTION_TARGETS)))
+    for col, target in enumerate(SECTION_TARGETS.values()):
+        for term in target['terms']:
+            weights[vocab[term], col] = 1.0
+    return vocab, weights
+
+
+if RANKING_AVAILABLE:
+    _SECTION_VOCAB, _SECTION_WEIGHTS = _build_section_weights()
+    _SECTION_NAMES = list(SECTION_TARGETS)
+
+
+def score_sections(sources):
+    """
+    BM25-scores every source against every section in one matrix pass.
+
+    Returns:
+        (n_sources x n_sections) numpy array of scores
+    """
+    n_docs, n_terms = len(sources), len(_SECTION_VOCAB)
+
+    # Flatten every (doc, term) hit into index arrays, then count with bincount
+    doc_lengths = np.zeros(n_docs)
+    doc_idx, term_idx = [], []
+    for i, source in enumerate(sources):
+        tokens = _WORD_RE.findall(f"{source.get('title', '')} {source.get('content', '')}".lower())
+        doc_lengths[i] = len(tokens)
+        hits = [_SECTION_VOCAB[t] for t in tokens if t in _SECTION_VOCAB]
+        term_idx.extend(hits)
+        doc_idx.extend([i] * len(hits))
+
+    flat = np.asarray(doc_idx, dtype=np.int64) * n_terms + np.asarray(term_idx, dtype=np.int64)
+    tf = np.bincount(flat, minlength=n_docs * n_terms).reshape(n_docs, n_terms).astype(float)
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+    avg_len = doc_lengths.mean() if n_docs and doc_lengths.mean() > 0 else 1.0
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_len)
+    bm25 = tf * (BM25_K1 + 1) / (tf + norm[:, None])
+    scores = (bm25 * idf) @ _SECTION_WEIGHTS
+
+    boost = np.ones_like(scores)
+    for col, target in enumerate(SECTION_TARGETS.values()):
+        aimed = np.array([bool(set(s.get('query_types', [])) & set(target['query_types'])) for s in sources])
+        boost[aimed, col] = QUERY_TYPE_BOOST
+    return scores * boost
+
+
+def select_relevant(sources, top_k=None):
+    """
+    Keeps the top-K sources per section; sources relevant to no section are dropped.
+
+    Each kept source gets a `relevance` in [0, 1] (its best normalized section
+    score) and the `sections` it was selected for.
+    """
+    if not RANKING_AVAILABLE or not sources:
+        return list(sources)
+    k = top_k or SECTION_TOP_K
+
+    scores = score_sections(sources)
+    col_max = scores.max(axis=0)
+    normalized = scores / np.where(col_max > 0, col_max, 1.0)
+
+    top = np.argsort(-scores, axis=0, kind='stable')[:k]
+    selected = np.zeros_like(scores, dtype=bool)
+    selected[top, np.arange(scores.shape[1])] = True
+    selected &= scores > 0
+
+    kept = []
+    for i in np.flatnonzero(selected.any(axis=1)):
+        source = dict(sources[i])
+        source['relevance'] = round(float(normalized[i].max()), 3)
+        source['sections'] = [_SECTION_NAMES[c] for c in np.flatnonzero(selected[i])]
+        kept.append(source)
+    return kept
+
+
+def source_value(source):
+    """Higher is more worth keeping: search and section relevance plus cross-query corroboration"""
+    score = source.get('score')
+    search_relevance = score if isinstance(score, (int, float)) else 0.5
+    return (search_relevance + source.get('relevance', 0.0)
+            + 0.25 * (len(source.get('query_types', [])) - 1))
+
+
+def format_source(idx, source):
+    types = ', '.join(t for t in source.get('query_types', [source.get('query_type')]) if t)
+    return (
+        f"\n\n[SOURCE {idx}]\n"
+        f"URL: {source['url']}\n"
+        f"Title: {source['title']}\n"
+        f"Type: {types}\n"
+        f"Content: {source['content']}\n"
+    )
+
+
+def format_context(sources):
+    return ''.join(format_source(idx, source) for idx, source in enumerate(sources, 1))
+
+
+def trim_to_budget(sources, token_budget):
+    """
+    Removes the lowest-value sources until the formatted context fits.
+
+    The best source of each query_type is only dropped once nothing else is
+    left to trim, so every research angle keeps some evidence.
+    """
+    costs = [estimate_tokens(format_source(0, s)) for s in sources]
+    total = sum(costs)
+    if total <= token_budget:
+        return list(sources)
+
+    best_per_type = {}
+    for idx, source in enumerate(sources):
+        query_type = source['query_types'][0]
+        if query_type not in best_per_type or source_value(source) > source_value(sources[best_per_type[query_type]]):
+            best_per_type[query_type] = idx
+    protected = set(best_per_type.values())
+
+    order = sorted(range(len(sources)), key=lambda i: (i in protected, source_value(sources[i]), -i))
+    dropped = set()
+    for idx in order:
+        if total <= token_budget:
+            break
+        dropped.add(idx)
+        total -= costs[idx]
+    return [s for i, s in enumerate(sources) if i not in dropped]
+
+
+def build_context(sources, token_budget=None):
+    """
+    Runs the full assembly stage.
+
+    Args:
+        sources: Raw source dicts from the search stage
+        token_budget: Max estimated context tokens (defaults to CONTEXT_TOKEN_BUDGET)
+
+    Returns:
+        (context_text, kept_sources, stats) where stats reports the merge,
+        relevance and budget counts and the estimated tokens saved versus
+        the naive context.
+    """
+    budget = token_budget or CONTEXT_TOKEN_BUDGET
+    tokens_before = estimate_tokens(format_context(
+        [dict(s, query_types=[s.get('query_type')]) for s in sources]
+    ))
+
+    merged = merge_duplicate_sources(sources)
+    collapsed = collapse_near_duplicates(merged)
+    relevant = select_relevant(collapsed)
+    kept = trim_to_budget(relevant, budget)
+    context = format_context(kept)
+    tokens_after = estimate_tokens(context)
+
+    stats = {
+        'sources_in': len(sources),
+        'duplicate_urls_merged': len(sources) - len(merged),
+        'near_duplicates_collapsed': len(merged) - len(collapsed),
+        'irrelevant_dropped': len(collapsed) - len(relevant),
+        'trimmed_for_budget': len(relevant) - len(kept),
+        'sources_out': len(kept),
+        'token_budget': budget,
+        'tokens_before': tokens_before,
+        'tokens_after': tokens_after,
+        'tokens_saved': tokens_before - tokens_after,
+    }
+    return context, kept, stats
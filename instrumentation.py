@@ -0,0 +1,248 @@
+"""
+Instrumentation - Lightweight per-stage timing for the ABM pipeline
+
+Wrap any stage in `span("name")`. The outermost span starts a trace; nested
+spans (including ones opened in worker threads submitted via `submit`) are
+collected into it. When the root span closes, its summary is sent to every
+registered sink.
+
+Sinks are configured from the environment or with `add_sink`:
+    INSTRUMENTATION_JSONL=timings.jsonl   one JSON record per trace
+    INSTRUMENTATION_PROM=abm.prom         Prometheus text-format histograms
+"""
+
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_current = contextvars.ContextVar('abm_trace', default=None)
+
+
+class Trace:
+    """All spans recorded under one root span"""
+
+    def __init__(self, name, attrs=None):
+        self.name = name
+        self.attrs = dict(attrs or {})
+        self.started_at = time.time()
+        self._start = time.perf_counter()
+        self.spans = []
+        self.llm = {'calls': 0, 'input_tokens': 0, 'output_tokens': 0}
+        self._lock = threading.Lock()
+
+    def add_span(self, name, duration_ms, attrs):
+        with self._lock:
+            self.spans.append({'name': name, 'duration_ms': round(duration_ms, 2), **attrs})
+
+    def add_llm_usage(self, input_tokens, output_tokens):
+        with self._lock:
+            self.llm['calls'] += 1
+            self.llm['input_tokens'] += input_tokens or 0
+            self.llm['output_tokens'] += output_tokens or 0
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self._start) * 1000
+
+    def summary(self):
+        """Per-stage count/total/max plus LLM usage, in milliseconds"""
+        stages = {}
+        with self._lock:
+            for span in self.spans:
+                stage = stages.setdefault(span['name'], {'count': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+                stage['count'] += 1
+                stage['total_ms'] = round(stage['total_ms'] + span['duration_ms'], 2)
+                stage['max_ms'] = max(stage['max_ms'], span['duration_ms'])
+            llm = dict(self.llm)
+        return {
+            'trace': self.name,
+            'total_ms': round(self.elapsed_ms(), 2),
+            'stages': stages,
+            'llm': llm,
+        }
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times the enclosed block as a stage called `name`.
+
+    Opens a new trace if none is active. Yields the active Trace so callers
+    can read `summary()` before the root span closes.
+    """
+    trace = _current.get()
+    is_root = trace is None
+    if is_root:
+        trace = Trace(name, attrs)
+        token = _current.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if is_root:
+            _current.reset(token)
+            emit(trace)
+        else:
+            trace.add_span(name, duration_ms, attrs)
+
+
+def current_trace():
+    return _current.get()
+
+
+def record_llm_usage(input_tokens=0, output_tokens=0):
+    """Adds one LLM call's token counts to the active trace (no-op outside a trace)"""
+    trace = _current.get()
+    if trace is not None:
+        trace.add_llm_usage(input_tokens, output_tokens)
+
+
+def submit(pool, fn, *args, **kwargs):
+    """executor.submit that carries the active trace into the worker thread"""
+    ctx = contextvars.copy_context()
+    return pool.submit(ctx.run, fn, *args, **kwargs)
+
+
+# --- SINKS ---
+
+class JsonLinesSink:
+    """Appends one JSON record per finished trace to `path`"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def emit(self, trace):
+        record = {'timestamp': trace.started_at, 'attrs': trace.attrs, **trace.summary()}
+        line = json.dumps(record, default=str) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+
+
+class PrometheusSink:
+    """
+    Keeps cumulative per-stage latency histograms and rewrites them to `path`
+    in Prometheus text format (for the node_exporter textfile collector).
+
+    Histograms live in process memory, so give each process its own file
+    (see role_path); `labels` are added to every series so the collector
+    can merge those files without duplicate series.
+    """
+
+    BUCKETS = [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+    def __init__(self, path, prefix='abm', labels=None):
+        self.path = path
+        self.prefix = prefix
+        self.labels = ''.join(f',{k}="{_escape(v)}"' for k, v in (labels or {}).items())
+        self._stages = {}
+        self._tokens = {'input': 0, 'output': 0}
+        self._lock = threading.Lock()
+
+    def _observe(self, stage, seconds):
+        hist = self._stages.setdefault(stage, {'buckets': [0] * len(self.BUCKETS), 'sum': 0.0, 'count': 0})
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                hist['buckets'][i] += 1
+        hist['sum'] += seconds
+        hist['count'] += 1
+
+    def emit(self, trace):
+        with self._lock:
+            self._observe(trace.name, trace.elapsed_ms() / 1000)
+            for s in list(trace.spans):
+                self._observe(s['name'], s['duration_ms'] / 1000)
+            self._tokens['input'] += trace.llm['input_tokens']
+            self._tokens['output'] += trace.llm['output_tokens']
+            text = self._render()
+            # Unique so two processes sharing a role never write the same temp file
+            tmp_path = f"{self.path}.{uuid.uuid4().hex[:12]}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            os.replace(tmp_path, self.path)
+
+    def _render(self):
+        metric = f"{self.prefix}_stage_duration_seconds"
+        lines = [f"# HELP {metric} Wall-clock time per pipeline stage",
+                 f"# TYPE {metric} histogram"]
+        for stage, hist in sorted(self._stages.items()):
+            label = f'stage="{_escape(stage)}"{self.labels}'
+            for bound, count in zip(self.BUCKETS, hist['buckets']):
+                lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {hist["count"]}')
+            lines.append(f'{metric}_sum{{{label}}} {hist["sum"]:.6f}')
+            lines.append(f'{metric}_count{{{label}}} {hist["count"]}')
+        tokens = f"{self.prefix}_llm_tokens_total"
+        lines.append(f"# HELP {tokens} LLM tokens consumed")
+        lines.append(f"# TYPE {tokens} counter")
+        for direction, count in self._tokens.items():
+            lines.append(f'{tokens}{{direction="{direction}"{self.labels}}} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def role_path(path, role):
+    """abm.prom -> abm.<role>.prom, so concurrent processes never share a file"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{role}{ext or '.prom'}"
+
+
+_sinks = []
+_sinks_lock = threading.Lock()
+
+
+def add_sink(sink):
+    with _sinks_lock:
+        _sinks.append(sink)
+    return sink
+
+
+def clear_sinks():
+    with _sinks_lock:
+        _sinks.clear()
+
+
+def emit(trace):
+    with _sinks_lock:
+        sinks = list(_sinks)
+    for sink in sinks:
+        try:
+            sink.emit(trace)
+        except Exception as e:
+            print(f"⚠️ Instrumentation sink failed: {e}")
+
+
+# Stable identity for this process's Prometheus file and `role` label: set
+# INSTRUMENTATION_ROLE per concurrently running entry point (e.g. app, batch);
+# render pool workers become <role>-render-<slot>, so recycled workers reuse
+# their slot's file instead of leaving orphans behind
+PROCESS_ROLE = os.environ.get("INSTRUMENTATION_ROLE", "main")
+_prom_sink = None
+
+
+def set_process_role(role):
+    """Moves this process's Prometheus histograms to the file and label for `role`"""
+    global PROCESS_ROLE, _prom_sink
+    PROCESS_ROLE = role
+    if _prom_sink is None:
+        return
+    with _sinks_lock:
+        if _prom_sink in _sinks:
+            _sinks.remove(_prom_sink)
+    _prom_sink = add_sink(PrometheusSink(role_path(os.environ["INSTRUMENTATION_PROM"], role),
+                                         labels={'role': role}))
+
+
+if os.environ.get("INSTRUMENTATION_JSONL"):
+    add_sink(JsonLinesSink(os.environ["INSTRUMENTATION_JSONL"]))
+if os.environ.get("INSTRUMENTATION_PROM"):
+    _prom_sink = add_sink(PrometheusSink(role_path(os.environ["INSTRUMENTATION_PROM"], PROCESS_ROLE),
+                                         labels={'role': PROCESS_ROLE}))
@@ -0,0 +1,96 @@
+"""
+Memory Cache - Thread-safe in-process LRU and stable content hashing
+
+Shared by the feature-match memo (workshop_features) and the rendered PDF
+cache (pdf_generator); the persistent SQLite stores live in research_cache.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def hash_key(*parts):
+    """Stable sha256 over JSON-encoded parts"""
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class LRUCache:
+    """
+    In-memory LRU bounded by entry count, total value size, or both.
+
+    Args:
+        max_entries: Entries kept (None for no count limit; 0 disables caching)
+        max_bytes: Total sizeof(value) kept (None for no size limit; values
+            larger than this are never stored)
+        sizeof: Size of one value (default len)
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.total_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        if self.max_entries is not None and self.max_entries <= 0:
+            return
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            while self._over_limit():
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_size
+                self.evictions += 1
+
+    def _over_limit(self):
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            return True
+        return self.max_bytes is not None and self.total_bytes > self.max_bytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        with self._lock:
+            entries, total_bytes = len(self._entries), self.total_bytes
+        lookups = self.hits + self.misses
+        stats = {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+        }
+        if self.max_entries is not None:
+            stats['max_entries'] = self.max_entries
+        if self.max_bytes is not None:
+            stats['bytes'] = total_bytes
+            stats['max_bytes'] = self.max_bytes
+        return stats
@@ -1,9 +1,33 @@
+import weasyprint
 from weasyprint import HTML, CSS
 from weasyprint.text.fonts import FontConfiguration
 from io import BytesIO
 from datetime import datetime
 import base64
 import os
+import uuid
+import hashlib
+import threading
+from jinja2 import Environment, FileSystemLoader
+from markupsafe import Markup
+from instrumentation import span
+from memory_cache import LRUCache, hash_key
+
+# Pillow ships with WeasyPrint; used to pre-scale the logo for optimized output
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+    print("⚠️ Pillow not available - optimized PDFs will embed the full-size logo")
+
+# Optional: rasterizes the first PDF page for PNG previews
+try:
+    import pypdfium2 as pdfium
+    RASTER_AVAILABLE = True
+except ImportError:
+    RASTER_AVAILABLE = False
+    print("⚠️ pypdfium2 not installed - PNG previews disabled (HTML previews still work)")
 
 # Import Workshop features matcher
 try:
@@ -13,469 +37,520 @@ except ImportError:
     FEATURES_AVAILABLE = False
     print("⚠️ workshop_features.py not found - feature matching disabled")
 
-def create_styled_pdf(structured_data, company_name, logo_path=None):
+# Layouts live in templates/<name>.html (+ optional <name>.css on top of
+# one_pager.css). Bump TEMPLATE_VERSION for changes outside the templates
+# that alter output, so cached PDFs rebuild.
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+BASE_STYLESHEET = 'one_pager.css'
+DEFAULT_LAYOUT = os.environ.get("PDF_LAYOUT", "one_pager")
+TEMPLATE_VERSION = 2
+
+# Total size of rendered PDFs kept in memory for repeat downloads (0 disables)
+PDF_RENDER_CACHE_MB = float(os.environ.get("PDF_RENDER_CACHE_MB", "64"))
+
+# Previews share the render cache's size budget; PNG scale 1.0 = 72 DPI
+PREVIEW_PNG_SCALE = float(os.environ.get("PREVIEW_PNG_SCALE", "1.0"))
+
+# Optimized output: recompress embedded images and embed a logo scaled to
+# its displayed height (LOGO_RASTER_SCALE x for sharpness when zoomed).
+# Fonts are subset to the glyphs used in both modes (WeasyPrint's default).
+PDF_OPTIMIZE = os.environ.get("PDF_OPTIMIZE", "").lower() in ("1", "true", "yes")
+LOGO_DISPLAY_HEIGHT = 30
+LOGO_RASTER_SCALE = 2
+
+
+FALLBACK_LOGO_HTML = '<div class="brand-text">Workshop</div>'
+
+
+def scale_logo(logo_bytes, height):
+    """Downscales a logo to `height` pixels tall as an optimized PNG (never upscales)"""
+    if not PIL_AVAILABLE:
+        return logo_bytes
+    with Image.open(BytesIO(logo_bytes)) as img:
+        if img.height <= height:
+            return logo_bytes
+        width = max(1, round(img.width * height / img.height))
+        scaled = img.convert('RGBA').resize((width, height), Image.LANCZOS)
+        out = BytesIO()
+        scaled.save(out, format='PNG', optimize=True)
+    return out.getvalue() if out.tell() < len(logo_bytes) else logo_bytes
+
+
+def load_logo(logo_path, max_height=None):
     """
-    Converts structured data into a branded Workshop PDF using WeasyPrint.
-    Uses Absolute Positioning for the main columns, but Flexbox for vertical flow 
-    to prevent content overlap.
+    Reads and base64-embeds the logo, optionally scaled down to `max_height` px.
+
+    Returns:
+        (logo_html, sha256 of the logo bytes) - the text wordmark and None
+        when there is no readable logo
     """
-    
-    # Extract sections
-    snapshot = structured_data.get('snapshot', {})
-    why_now = structured_data.get('why_now', [])
-    personas = structured_data.get('personas', [])
-    openers = structured_data.get('openers', [])
-    metadata = structured_data.get('_metadata', {})
-    
-    # --- PREPARE ASSETS ---
-    logo_img = ""
     if logo_path and os.path.exists(logo_path):
         try:
             with open(logo_path, 'rb') as f:
-                logo_b64 = base64.b64encode(f.read()).decode()
-            logo_img = f'<img src="data:image/png;base64,{logo_b64}" class="brand-logo"/>'
+                logo_bytes = f.read()
+            digest = hashlib.sha256(logo_bytes).hexdigest()
+            if max_height:
+                logo_bytes = scale_logo(logo_bytes, max_height)
+            logo_b64 = base64.b64encode(logo_bytes).decode()
+            return f'<img src="data:image/png;base64,{logo_b64}" class="brand-logo"/>', digest
         except Exception:
-            logo_img = '<div class="brand-text">Workshop</div>'
-    else:
-        logo_img = '<div class="brand-text">Workshop</div>'
-
-    # --- HTML HELPERS ---
-
-    def truncate_text(text, limit=120):
-        """Forces text to fit within layout constraints"""
-        if not text: return ""
-        text = str(text)
-        if len(text) > limit:
-            return text[:limit].rstrip() + "..."
-        return text
-
-    def get_linked_val(data_item, default="Unknown", class_name=""):
-        """Handles rich objects {value, source_url}"""
-        if isinstance(data_item, dict):
-            val = data_item.get('value', default)
-            url = data_item.get('source_url')
-            val = truncate_text(val, 35) 
-            if url and url.startswith('http'):
-                return f'<a href="{url}" target="_blank" class="text-link {class_name}">{val}</a>'
-            return val
-        return truncate_text(str(data_item), 35) if data_item else default
-
-    def get_tech_ecosystem_html(stack):
-        if not stack: return '<div class="empty-state">No tech data available</div>'
-        
-        stack_str = str(stack).lower()
-        has_teams = "teams" in stack_str
-        
-        html = ""
-        
-        # 1. Integration Highlight
-        if has_teams:
-            html += """
-            <div class="integration-highlight">
-                <span class="highlight-icon">✓</span> 
-                <strong>Microsoft Teams Ready</strong>
-                <div class="highlight-sub">Workshop pushes directly to Teams channels</div>
-            </div>
-            """
-            
-        # 2. Tech Pills
-        html += '<div class="tech-grid">'
-        count = 0
-        for item in stack: 
-            if count >= 9: break 
-            
-            if isinstance(item, dict):
-                tool_name = item.get('tool', 'Unknown')
-                url = item.get('source_url')
-            else:
-                tool_name = str(item)
-                url = None
-                
-            if has_teams and "teams" in tool_name.lower():
-                continue
-            
-            tool_name = truncate_text(tool_name, 20)
-            
-            if url:
-                html += f'<a href="{url}" target="_blank" class="tech-pill clickable" title="View Source">{tool_name} 🔗</a>'
-            else:
-                html += f'<span class="tech-pill">{tool_name}</span>'
-            
-            count += 1
-        html += '</div>'
-        
-        return html
-
-    def get_openers_html(openers_list):
-        if not openers_list: return '<div class="empty-state">No scripts generated</div>'
-        html = ""
-        for opener in openers_list[:2]:
-            label = opener.get('label', 'Opener')
-            # NO TRUNCATION HERE - show full script
-            script = opener.get('script', '') 
-            html += f"""
-            <div class="opener-box">
-                <div class="opener-label">{label}</div>
-                <div class="opener-script">"{script}"</div>
-            </div>
-            """
-        return html
-
-    def get_solution_match_table():
-        if not FEATURES_AVAILABLE: return ""
-        matches = match_features_to_company(structured_data)
-        if not matches: return ""
-        
-        rows = ""
-        for m in matches[:3]: 
-            pains = ", ".join([k.title() for k in m.get('matched_keywords', [])[:2]])
-            if not pains: pains = "General Efficiency"
-            pains = truncate_text(pains, 60)
-            
-            value_prop = m['features'][0] if m['features'] else "Streamline communications"
-            value_prop = truncate_text(value_prop, 90)
-            
-            rows += f"""
-            <tr>
-                <td class="col-pain"><strong>{pains}</strong></td>
-                <td class="col-feature">{m['name']}</td>
-                <td class="col-value">{value_prop}</td>
-            </tr>
-            """
-            
-        return f"""
-        <div class="solution-section">
-            <div class="section-title" style="margin-bottom:10px;">🛠️ Workshop Solution Match</div>
-            <table class="solution-table">
-                <thead>
-                    <tr>
-                        <th width="25%">Detected Pain</th>
-                        <th width="30%">Workshop Feature</th>
-                        <th width="45%">Value Prop for Script</th>
-                    </tr>
-                </thead>
-                <tbody>{rows}</tbody>
-            </table>
-        </div>
+            pass
+    return FALLBACK_LOGO_HTML, None
+
+
+def optimized_write_options():
+    """write_pdf keyword arguments for image optimization (fonts are subset by default)"""
+    major = int(weasyprint.__version__.split('.')[0])
+    if major >= 59:
+        return {'optimize_images': True}
+    return {'optimize_size': ('fonts', 'images')}
+
+
+# --- TEMPLATES ---
+
+def clip(text, limit=120):
+    """Template filter: forces text to fit within layout constraints"""
+    if not text: return ""
+    text = str(text)
+    if len(text) > limit:
+        return text[:limit].rstrip() + "..."
+    return text
+
+
+def make_template_env(template_dir=TEMPLATE_DIR):
+    """Jinja environment with HTML auto-escaping; templates compile once per environment"""
+    env = Environment(
+        loader=FileSystemLoader(template_dir),
+        autoescape=True,
+        auto_reload=False,
+        trim_blocks=True,
+        lstrip_blocks=True,
+    )
+    env.filters['clip'] = clip
+    return env
+
+
+def available_layouts(template_dir=TEMPLATE_DIR):
+    return sorted(name[:-5] for name in os.listdir(template_dir) if name.endswith('.html'))
+
+
+class CompiledLayout:
+    """A compiled layout template, its stylesheet and a versioned template ID"""
+
+    def __init__(self, env, name, template_dir=TEMPLATE_DIR):
+        if name not in available_layouts(template_dir):
+            raise ValueError(f"Unknown PDF layout '{name}' - available: {', '.join(available_layouts(template_dir))}")
+        self.name = name
+        self.template = env.get_template(f"{name}.html")
+
+        css_parts = []
+        for css_name in dict.fromkeys([BASE_STYLESHEET, f"{name}.css"]):
+            css_path = os.path.join(template_dir, css_name)
+            if os.path.exists(css_path):
+                with open(css_path, encoding='utf-8') as f:
+                    css_parts.append(f.read())
+        self.css_string = '\n'.join(css_parts)
+
+        # Layouts can extend each other, so any template file change bumps every ID
+        digest = hashlib.sha256(str(TEMPLATE_VERSION).encode())
+        for file_name in sorted(os.listdir(template_dir)):
+            with open(os.path.join(template_dir, file_name), 'rb') as f:
+                digest.update(file_name.encode() + b'\0' + f.read())
+        self.template_id = f"{name}@v{TEMPLATE_VERSION}-{digest.hexdigest()[:12]}"
+
+
+class OnePagerRenderer:
+    """
+    Renders one-pagers while reusing the expensive setup between calls.
+
+    Layout templates are compiled once. The FontConfiguration and each
+    layout's parsed stylesheet are built on first use (per thread, as
+    WeasyPrint objects are not shared across threads) and the embedded logo
+    markup once per logo path. Call `invalidate()` after the logo file,
+    templates or stylesheets change.
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR):
+        self.template_dir = template_dir
+        self._env = make_template_env(template_dir)
+        self._layouts = {}
+        self._generation = 0
+        self._logos = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drops compiled templates, prepared fonts and stylesheets, and logos"""
+        with self._lock:
+            self._env = make_template_env(self.template_dir)
+            self._layouts.clear()
+            self._logos.clear()
+            self._generation += 1
+
+    def layout(self, name=None):
+        """The CompiledLayout for `name` (default PDF_LAYOUT), compiled on first use"""
+        name = name or DEFAULT_LAYOUT
+        with self._lock:
+            compiled = self._layouts.get(name)
+            if compiled is None:
+                compiled = CompiledLayout(self._env, name, self.template_dir)
+                self._layouts[name] = compiled
+        return compiled
+
+    def stylesheet(self, layout=None):
+        """(FontConfiguration, CSS) for the calling thread and layout, built on first use"""
+        local = self._local
+        if getattr(local, 'generation', None) != self._generation:
+            local.font_config = FontConfiguration()
+            local.stylesheets = {}
+            local.generation = self._generation
+        compiled = self.layout(layout)
+        stylesheet = local.stylesheets.get(compiled.name)
+        if stylesheet is None:
+            stylesheet = CSS(string=compiled.css_string, font_config=local.font_config)
+            local.stylesheets[compiled.name] = stylesheet
+        return local.font_config, stylesheet
+
+    def logo(self, logo_path, optimized=False):
+        """(logo_html, logo_digest) for `logo_path`, read (and scaled) once"""
+        key = (logo_path, optimized)
+        with self._lock:
+            cached = self._logos.get(key)
+        if cached is None:
+            max_height = LOGO_DISPLAY_HEIGHT * LOGO_RASTER_SCALE if optimized else None
+            cached = load_logo(logo_path, max_height=max_height)
+            with self._lock:
+                self._logos[key] = cached
+        return cached
+
+    def build_html(self, structured_data, company_name, logo_path=None, optimized=False, layout=None):
+        """The one-pager document rendered from its layout template"""
+        context = build_one_pager_context(structured_data, company_name, self.logo(logo_path, optimized)[0])
+        return self.layout(layout).template.render(context)
+
+    def render(self, structured_data, company_name, logo_path=None, output=None, optimized=None,
+               layout=None):
+        """
+        Renders the one-pager.
+
+        Args:
+            output: None for an in-memory BytesIO, a file path (written to a
+                temp file and renamed into place when complete), or an open
+                binary file object written in place
+            optimized: Optimize images and embed a display-sized logo (defaults
+                to PDF_OPTIMIZE)
+            layout: Template name under templates/ (defaults to PDF_LAYOUT)
+
+        Returns:
+            The BytesIO, the path, or the file object
         """
+        optimized = PDF_OPTIMIZE if optimized is None else optimized
+        with span("create_styled_pdf", company=company_name):
+            with span("pdf:html_build"):
+                html_content = self.build_html(structured_data, company_name, logo_path, optimized, layout)
 
-    # --- CONTENT GENERATION ---
-    industry = snapshot.get('industry', 'Unknown')
-    location = snapshot.get('location', 'Unknown')
-    size = snapshot.get('size', 'Unknown')
-    fiscal = get_linked_val(snapshot.get('fiscal_year'))
-    glassdoor = get_linked_val(snapshot.get('glassdoor_score'))
-    
-    tech_html = get_tech_ecosystem_html(snapshot.get('tech_stack', []))
-    openers_html = get_openers_html(openers)
-    
-    why_now_rows = ""
-    for item in why_now[:2]:
-        title = item.get('title', 'Insight')
-        desc = item.get('description', '')
-        url = item.get('source_url')
-        
-        title = truncate_text(title, 70)
-        desc = truncate_text(desc, 350)
-        
-        if url:
-            title_html = f'<a href="{url}" target="_blank" class="why-now-link">{title}</a>'
-        else:
-            title_html = title
-            
-        why_now_rows += f'''
-        <div class="why-now-item">
-            <div class="why-now-icon">⚡</div>
-            <div class="why-now-content">
-                <strong>{title_html}</strong>
-                <p>{desc}</p>
-            </div>
-        </div>
-        '''
-
-    personas_cards = ""
-    for p in personas[:2]:
-        name = truncate_text(p.get('name', 'Internal Comms Lead'), 35)
-        role = truncate_text(p.get('role', 'Decision Maker'), 40)
-        email = p.get('email', 'Unknown')
-        linkedin = p.get('linkedin_url')
-        is_verified = p.get('is_named_person', False)
-        
-        if linkedin:
-            name_html = f'<a href="{linkedin}" target="_blank" class="persona-link">{name} <span style="font-size:10px">🔗</span></a>'
-        else:
-            name_html = name
-
-        verified_badge = '<span class="verified-badge">✓ Verified</span>' if is_verified else ''
-        email_html = f'<div class="persona-email">📧 {truncate_text(email, 35)}</div>' if email and email != 'Unknown' else ''
-        
-        goals_list = "".join([f"<li>{truncate_text(g, 100)}</li>" for g in p.get('goals', [])[:2]])
-        fears_list = "".join([f"<li>{truncate_text(f, 100)}</li>" for f in p.get('fears', [])[:2]])
-        
-        personas_cards += f'''
-        <div class="persona-card">
-            <div class="persona-header">
-                <div class="persona-top-row">
-                    <span class="persona-icon">👤</span>
-                    <div class="persona-identity">
-                        <div class="persona-name">{name_html}</div>
-                        <div class="persona-role">{role}</div>
-                    </div>
-                </div>
-                {verified_badge}
-                {email_html}
-            </div>
-            <div class="persona-body">
-                <div class="persona-section">
-                    <div class="persona-label" style="color:#10b981;">GOALS</div>
-                    <ul>{goals_list}</ul>
-                </div>
-                <div class="persona-section">
-                    <div class="persona-label" style="color:#ef4444;">PAINS</div>
-                    <ul>{fears_list}</ul>
-                </div>
-            </div>
-        </div>
-        '''
-
-    solution_table_html = get_solution_match_table()
-    sources_count = len(metadata.get('all_sources', []))
-    
-    # --- CSS STRATEGY ---
-    css_string = """
-    @page { size: Letter; margin: 0; }
-    @font-face { font-family: 'Inter'; src: local('Arial'); }
-
-    body {
-        font-family: 'Inter', sans-serif;
-        margin: 0; padding: 0;
-        background-color: #ffffff; color: #1f2937;
-        font-size: 10px;
-        line-height: 1.4;
-    }
-    
-    a { text-decoration: none; color: inherit; }
-    .text-link { color: #93c5fd; text-decoration: underline; }
-    .why-now-link { color: #0ea5e9; text-decoration: underline; }
-    .tech-pill.clickable { cursor: pointer; color: #bfdbfe; border: 1px solid #60a5fa; }
-    .persona-link { color: #1e40af; border-bottom: 1px dotted #1e40af; }
-
-    /* LAYOUT: ABSOLUTE COLUMNS + FLEX CONTENT */
-    
-    /* Sidebar Column */
-    .sidebar {
-        position: absolute;
-        top: 0;
-        bottom: 0;
-        left: 0;
-        width: 34%;
-        background-color: #1e3a8a;
-        color: #ffffff;
-        padding: 25px;
-        box-sizing: border-box;
-        display: flex;
-        flex-direction: column;
-        gap: 15px; /* Reduced gap to fit content */
-    }
-    
-    /* Main Content Column */
-    .main-content { 
-        position: absolute;
-        top: 0;
-        bottom: 0;
-        right: 0;
-        width: 66%;
-        padding: 35px 45px;
-        box-sizing: border-box;
-    }
+            with span("pdf:write_pdf"):
+                font_config, stylesheet = self.stylesheet(layout)
+                html = HTML(string=html_content)
+                options = optimized_write_options() if optimized else {}
 
-    /* FOOTER STRATEGY */
-    
-    /* Sidebar Footer: Uses margin-top:auto to sit at bottom of flex container */
-    .sidebar-footer {
-        margin-top: auto; 
-        font-size: 8px; 
-        opacity: 0.5;
-    }
+                def write(target):
+                    html.write_pdf(target, stylesheets=[stylesheet], font_config=font_config, **options)
 
-    /* Main Footer: Pinned to bottom right corner */
-    .main-footer {
-        position: absolute;
-        bottom: 35px;
-        left: 45px;
-        right: 45px;
-        font-size: 8px; 
-        color: #9ca3af; 
-        display: flex; 
-        justify-content: space-between;
-        border-top: 1px solid #e5e7eb; 
-        padding-top: 10px;
-    }
+                if output is None:
+                    result_file = BytesIO()
+                    write(result_file)
+                    result_file.seek(0)
+                    return result_file
+                if isinstance(output, (str, os.PathLike)):
+                    write_pdf_atomic(write, output)
+                    return output
+                write(output)
+                return output
 
-    /* COMPONENT STYLES */
-    .brand-logo { max-height: 30px; width: auto; filter: brightness(0) invert(1); }
-    .brand-text { font-size: 24px; font-weight: 800; color: white; }
 
-    .sidebar-box {
-        background: rgba(255, 255, 255, 0.1);
-        border: 1px solid rgba(255, 255, 255, 0.2);
-        border-radius: 8px;
-        padding: 15px;
-        flex-shrink: 0; /* Prevent shrinking if space is tight */
-    }
+_renderer = None
+_renderer_lock = threading.Lock()
 
-    .sidebar-title {
-        color: #93c5fd;
-        font-size: 9px;
-        font-weight: 700;
-        text-transform: uppercase;
-        letter-spacing: 1px;
-        margin-bottom: 12px;
-        border-bottom: 1px solid rgba(255,255,255,0.2);
-        padding-bottom: 5px;
-    }
 
-    .stat-row { display: flex; justify-content: space-between; margin-bottom: 8px; align-items: center; }
-    .stat-label { font-size: 9px; opacity: 0.8; }
-    .stat-val { font-size: 10px; font-weight: 600; text-align: right; }
+def get_renderer():
+    """The process-wide renderer, created on first use"""
+    global _renderer
+    if _renderer is None:
+        with _renderer_lock:
+            if _renderer is None:
+                _renderer = OnePagerRenderer()
+    return _renderer
 
-    .tech-grid { display: flex; flex-wrap: wrap; gap: 5px; }
-    .tech-pill { 
-        background: rgba(0,0,0,0.2); padding: 4px 8px; 
-        border-radius: 4px; font-size: 9px; 
-        border: 1px solid rgba(255,255,255,0.1);
-    }
-    
-    .integration-highlight {
-        background: #eff6ff; color: #1e3a8a;
-        padding: 10px; border-radius: 6px;
-        margin-bottom: 10px; border-left: 3px solid #3b82f6;
-    }
-    .highlight-sub { font-size: 8px; opacity: 0.8; margin-top: 2px; }
-
-    .opener-box { margin-bottom: 12px; }
-    .opener-label { font-size: 8px; color: #60a5fa; font-weight: 700; text-transform: uppercase; margin-bottom: 3px; }
-    .opener-script {
-        font-style: italic; font-size: 10px; line-height: 1.4;
-        background: rgba(0,0,0,0.2); padding: 8px;
-        border-radius: 0 6px 6px 6px; border-left: 2px solid #60a5fa;
-    }
 
-    .header { 
-        border-bottom: 2px solid #f3f4f6; 
-        padding-bottom: 15px; margin-bottom: 25px; 
-        display: flex; justify-content: space-between; align-items: flex-end;
-    }
-    .company-name { font-size: 24px; font-weight: 800; color: #111827; line-height: 1; }
-    .report-meta { text-align: right; color: #6b7280; font-size: 9px; }
+def invalidate_assets():
+    """Invalidation hook: call after replacing the logo file, a template or a stylesheet"""
+    get_renderer().invalidate()
 
-    .section-title { 
-        font-size: 14px; font-weight: 700; color: #1e3a8a; 
-        text-transform: uppercase; letter-spacing: 0.5px; 
-        margin-bottom: 15px; display: flex; align-items: center; gap: 8px;
-    }
 
-    .why-now-item { 
-        background: #f0f9ff; border-left: 4px solid #0ea5e9; 
-        padding: 12px 15px; margin-bottom: 12px; 
-        display: flex; gap: 10px; border-radius: 0 4px 4px 0;
-    }
-    .why-now-content p { margin: 3px 0 0 0; font-size: 10px; color: #374151; }
-    
-    .persona-grid { display: flex; gap: 15px; margin-bottom: 25px; }
-    .persona-card { flex: 1; border: 1px solid #e5e7eb; border-radius: 6px; overflow: hidden; }
-    .persona-header { background: #f9fafb; padding: 10px 12px; border-bottom: 1px solid #e5e7eb; }
-    
-    .persona-top-row { display: flex; gap: 8px; align-items: center; margin-bottom: 5px; }
-    .persona-name { font-weight: 800; color: #111827; font-size: 11px; }
-    .persona-role { font-size: 9px; color: #6b7280; margin-top: 1px; }
-    
-    .verified-badge { 
-        display: inline-block; background: #d1fae5; color: #059669; 
-        padding: 2px 6px; border-radius: 10px; font-size: 8px; font-weight: 600; 
-        margin-bottom: 4px;
-    }
-    .persona-email { font-family: monospace; font-size: 9px; color: #4b5563; background: #e5e7eb; padding: 2px 5px; border-radius: 3px; display: inline-block; }
-    
-    .persona-body { padding: 12px; }
-    .persona-body ul { margin: 0; padding-left: 15px; }
-    .persona-body li { margin-bottom: 3px; font-size: 9px; color: #4b5563; }
-
-    .solution-table {
-        width: 100%; border-collapse: collapse; font-size: 9px; margin-bottom: 20px;
-    }
-    .solution-table th {
-        text-align: left; background-color: #f3f4f6; padding: 10px;
-        border-bottom: 2px solid #e5e7eb; color: #4b5563; font-weight: 700;
-    }
-    .solution-table td {
-        padding: 10px; border-bottom: 1px solid #e5e7eb; vertical-align: top;
+def write_pdf_atomic(write, path):
+    """
+    Calls `write(tmp_path)` and renames the temp file onto `path`, so a
+    crash mid-render never leaves a truncated PDF under the final name.
+    """
+    # Unique per call, so concurrent renders to the same path never share a temp file
+    tmp_path = f"{os.fspath(path)}.{uuid.uuid4().hex[:12]}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def create_styled_pdf(structured_data, company_name, logo_path=None, output=None, optimized=None,
+                      layout=None):
+    """
+    Converts structured data into a branded Workshop PDF using WeasyPrint.
+    Uses Absolute Positioning for the main columns, but Flexbox for vertical flow 
+    to prevent content overlap.
+
+    Pass `output` (a file path or open binary file) to stream the PDF there
+    instead of returning a BytesIO; paths are written atomically. Pass
+    `optimized=True` (or set PDF_OPTIMIZE=1) for the smaller optimized output,
+    and `layout` (or PDF_LAYOUT) to pick a template such as 'compact'.
+    """
+    return get_renderer().render(structured_data, company_name, logo_path=logo_path,
+                                 output=output, optimized=optimized, layout=layout)
+
+
+def compare_output_size(structured_data, company_name, logo_path=None):
+    """
+    Renders the standard and optimized PDFs and reports their sizes.
+
+    Returns:
+        Dict with standard_bytes, optimized_bytes, saved_bytes and saved_pct
+    """
+    renderer = get_renderer()
+    standard = len(renderer.render(structured_data, company_name, logo_path=logo_path, optimized=False).getvalue())
+    optimized = len(renderer.render(structured_data, company_name, logo_path=logo_path, optimized=True).getvalue())
+    saved = standard - optimized
+    report = {
+        'standard_bytes': standard,
+        'optimized_bytes': optimized,
+        'saved_bytes': saved,
+        'saved_pct': round(100 * saved / standard, 1) if standard else 0.0,
     }
-    .col-pain { color: #ef4444; }
-    .col-feature { color: #2563eb; font-weight: 600; }
-    .col-value { color: #374151; }
+    print(f"🗜️ {company_name}: {standard / 1024:.0f} KB -> {optimized / 1024:.0f} KB "
+          f"({report['saved_pct']}% smaller)")
+    return report
+
+
+# --- RENDER CACHE ---
+
+# Rendered PDFs (and previews), bounded by their total size
+_render_cache = LRUCache(max_bytes=int(PDF_RENDER_CACHE_MB * 1024 * 1024))
+
+
+def render_cache_key(structured_data, company_name, logo_digest, optimized=False, template_id=None):
+    """
+    Hash of everything that shows up in the PDF. The date is included
+    because the sidebar footer prints it.
+    """
+    return hash_key(
+        template_id or TEMPLATE_VERSION,
+        optimized,
+        datetime.now().strftime("%Y-%m-%d"),
+        company_name,
+        logo_digest,
+        structured_data,
+    )
+
+
+def render_pdf_bytes(structured_data, company_name, logo_path=None, optimized=None, layout=None, pool=None):
     """
+    Returns the one-pager as bytes, served from the render cache when this
+    exact profile, company name, logo and template were rendered before.
 
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head><meta charset="UTF-8"></head>
-    <body>
-        <div class="sidebar">
-            <div class="brand-area" style="margin-bottom:20px;">
-                {logo_img}
-            </div>
-
-            <div class="sidebar-box">
-                <div class="sidebar-title">Quick Stats</div>
-                <div class="stat-row"><span class="stat-label">Industry</span><span class="stat-val">{industry}</span></div>
-                <div class="stat-row"><span class="stat-label">HQ Location</span><span class="stat-val">{location}</span></div>
-                <div class="stat-row"><span class="stat-label">Employees</span><span class="stat-val">{size}</span></div>
-                <div class="stat-row"><span class="stat-label">Fiscal Year</span><span class="stat-val">{fiscal}</span></div>
-                <div class="stat-row"><span class="stat-label">Glassdoor</span><span class="stat-val">{glassdoor}</span></div>
-            </div>
-
-            <div class="sidebar-box">
-                <div class="sidebar-title">Tech Ecosystem</div>
-                {tech_html}
-            </div>
-
-            <div class="sidebar-box" style="flex-grow: 1;">
-                <div class="sidebar-title">⚡ Call Scripts</div>
-                {openers_html}
-            </div>
-            
-            <div class="sidebar-footer">
-                Internal Use Only • {datetime.now().strftime("%Y-%m-%d")}
-            </div>
-        </div>
-
-        <div class="main-content">
-            <div class="header">
-                <div class="company-name">{company_name}</div>
-                <div class="report-meta">ACCOUNT INTELLIGENCE BRIEF</div>
-            </div>
-
-            <div class="section-title">🚀 Why Reach Out Now</div>
-            <div class="why-now-container">{why_now_rows}</div>
-
-            <div class="section-title">👥 Key Decision Makers</div>
-            <div class="persona-grid">{personas_cards}</div>
-
-            {solution_table_html}
-            
-            <div class="main-footer">
-                <div>AI Research Agent v2.1 • Internal Use Only</div>
-                <div>{sources_count} Sources Analyzed</div>
-            </div>
-        </div>
-    </body>
-    </html>
+    Args:
+        pool: A render_pool.RenderPool to render cache misses in, off this
+            process's GIL; renders in-process when None
     """
-    
-    font_config = FontConfiguration()
-    html = HTML(string=html_content)
-    result_file = BytesIO()
-    html.write_pdf(result_file, stylesheets=[CSS(string=css_string, font_config=font_config)])
-    result_file.seek(0)
-    return result_file
+    optimized = PDF_OPTIMIZE if optimized is None else optimized
+    renderer = get_renderer()
+    _, logo_digest = renderer.logo(logo_path, optimized)
+    template_id = renderer.layout(layout).template_id
+    key = render_cache_key(structured_data, company_name, logo_digest, optimized, template_id)
+    pdf_bytes = _render_cache.get(key)
+    if pdf_bytes is None:
+        if pool is not None:
+            pdf_bytes = pool.render(structured_data, company_name, logo_path=logo_path,
+                                    optimized=optimized, layout=layout)
+        else:
+            pdf_bytes = renderer.render(structured_data, company_name, logo_path=logo_path,
+                                        optimized=optimized, layout=layout).getvalue()
+        _render_cache.put(key, pdf_bytes)
+    return pdf_bytes
+
+
+# --- PREVIEW ---
+
+# Lays the page out on a Letter-sized sheet when shown in a browser iframe
+PREVIEW_CSS = """
+html { background: #e5e7eb; }
+body { position: relative; width: 8.5in; min-height: 11in; margin: 0 auto; background: #ffffff; overflow: hidden; }
+.detail-page { position: absolute; top: 11in; left: 0; right: 0; background: #ffffff; border-top: 1px dashed #9ca3af; }
+"""
+
+
+def preview_html(html_content, css_string):
+    """Inlines the layout stylesheet so the HTML renders standalone in a browser"""
+    style = f"<style>{css_string}\n{PREVIEW_CSS}</style>"
+    return html_content.replace('</head>', f"{style}</head>", 1)
+
+
+def rasterize_first_page(pdf_bytes, scale=PREVIEW_PNG_SCALE):
+    """Renders page one of a PDF to PNG bytes (needs pypdfium2)"""
+    pdf = pdfium.PdfDocument(pdf_bytes)
+    try:
+        image = pdf[0].render(scale=scale).to_pil()
+    finally:
+        pdf.close()
+    out = BytesIO()
+    image.save(out, format='PNG', optimize=True)
+    return out.getvalue()
+
+
+def render_preview(structured_data, company_name, logo_path=None, layout=None, png=False):
+    """
+    Fast preview of the exact one-pager layout, cached per profile hash.
+
+    The HTML comes straight from the layout template, with no WeasyPrint
+    layout pass, so it is ready almost instantly. With png=True (and
+    pypdfium2 installed) a low-resolution raster of page one is added;
+    that does need a PDF render, so it is only made on request (it also
+    needs Pillow; png stays None without either).
+
+    Returns:
+        Dict with 'html', 'png' (bytes or None) and 'template_id'
+    """
+    renderer = get_renderer()
+    compiled = renderer.layout(layout)
+    _, logo_digest = renderer.logo(logo_path, optimized=True)
+    key = render_cache_key(structured_data, company_name, logo_digest, template_id=compiled.template_id)
+
+    with span("pdf_preview", company=company_name):
+        html = _render_cache.get(('preview-html', key))
+        if html is None:
+            html_content = renderer.build_html(structured_data, company_name, logo_path, optimized=True, layout=layout)
+            html = preview_html(html_content, compiled.css_string)
+            _render_cache.put(('preview-html', key), html)
+
+        png_bytes = None
+        if png and RASTER_AVAILABLE and PIL_AVAILABLE:
+            png_bytes = _render_cache.get(('preview-png', key))
+            if png_bytes is None:
+                pdf_bytes = render_pdf_bytes(structured_data, company_name, logo_path=logo_path, layout=layout)
+                png_bytes = rasterize_first_page(pdf_bytes)
+                _render_cache.put(('preview-png', key), png_bytes)
+
+    return {'html': html, 'png': png_bytes, 'template_id': compiled.template_id}
+
+
+def render_cache_stats():
+    return _render_cache.stats()
+
+
+def clear_render_cache():
+    _render_cache.clear()
+
+
+def safe_url(url):
+    """Only http(s) links make it into the document"""
+    if isinstance(url, str) and url.startswith(('http://', 'https://')):
+        return url
+    return None
+
+
+def linked_value(data_item, default="Unknown"):
+    """Handles rich objects {value, source_url} as {text, url}"""
+    if isinstance(data_item, dict):
+        return {'text': clip(data_item.get('value', default), 35), 'url': safe_url(data_item.get('source_url'))}
+    return {'text': clip(str(data_item), 35) if data_item else default, 'url': None}
+
+
+def build_one_pager_context(structured_data, company_name, logo_html):
+    """
+    Shapes a profile into the variables the layout templates render.
+    Layouts choose how many items of each list to show and where to clip text.
+    """
+    snapshot = structured_data.get('snapshot', {})
+    metadata = structured_data.get('_metadata', {})
+
+    stack = snapshot.get('tech_stack', []) or []
+    has_teams = "teams" in str(stack).lower()
+    tech_stack = []
+    for item in stack:
+        if isinstance(item, dict):
+            tool = {'name': str(item.get('tool', 'Unknown')), 'url': safe_url(item.get('source_url'))}
+        else:
+            tool = {'name': str(item), 'url': None}
+        # Teams gets its own integration highlight instead of a pill
+        if has_teams and "teams" in tool['name'].lower():
+            continue
+        tech_stack.append(tool)
+
+    openers = [
+        {'label': o.get('label', 'Opener'), 'script': o.get('script', '')}
+        for o in structured_data.get('openers', []) if isinstance(o, dict)
+    ]
+
+    why_now = [
+        {'title': item.get('title', 'Insight'), 'description': item.get('description', ''),
+         'url': safe_url(item.get('source_url'))}
+        for item in structured_data.get('why_now', []) if isinstance(item, dict)
+    ]
+
+    personas = []
+    for p in structured_data.get('personas', []):
+        if not isinstance(p, dict):
+            continue
+        email = p.get('email', 'Unknown')
+        personas.append({
+            'name': p.get('name', 'Internal Comms Lead'),
+            'role': p.get('role', 'Decision Maker'),
+            'email': email if email and email != 'Unknown' else '',
+            'linkedin_url': safe_url(p.get('linkedin_url')),
+            'is_named_person': p.get('is_named_person', False),
+            'goals': p.get('goals', []) or [],
+            'fears': p.get('fears', []) or [],
+        })
+
+    solution_matches = []
+    if FEATURES_AVAILABLE:
+        for m in match_features_to_company(structured_data):
+            pains = ", ".join([k.title() for k in m.get('matched_keywords', [])[:2]])
+            solution_matches.append({
+                'name': m['name'],
+                'pains': pains or "General Efficiency",
+                'value_prop': m['features'][0] if m['features'] else "Streamline communications",
+                'features': m['features'],
+            })
+
+    angles = [a for a in structured_data.get('angles', []) if isinstance(a, dict)]
+
+    return {
+        'company_name': company_name,
+        'logo_html': Markup(logo_html),
+        'industry': snapshot.get('industry', 'Unknown'),
+        'location': snapshot.get('location', 'Unknown'),
+        'size': snapshot.get('size', 'Unknown'),
+        'fiscal': linked_value(snapshot.get('fiscal_year')),
+        'glassdoor': linked_value(snapshot.get('glassdoor_score')),
+        'has_tech_data': bool(stack),
+        'has_teams': has_teams,
+        'tech_stack': tech_stack,
+        'openers': openers,
+        'why_now': why_now,
+        'personas': personas,
+        'angles': angles,
+        'solution_matches': solution_matches,
+        'sources_count': len(metadata.get('all_sources', [])),
+        'generated_on': datetime.now().strftime("%Y-%m-%d"),
+    }
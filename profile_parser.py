@@ -0,0 +1,151 @@
+"""
+Profile Parser - Turns raw LLM output into the structured profile dict
+
+Handles markdown code fences, can parse a streamed response incrementally
+(emitting each top-level section as soon as its value closes), and salvages
+the well-formed sections of truncated or slightly broken output.
+"""
+
+import re
+import json
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+PROFILE_SECTIONS = ['snapshot', 'openers', 'why_now', 'personas', 'angles']
+
+
+def lenient_loads(raw):
+    """json.loads that also tolerates trailing commas, a common LLM slip"""
+    try:
+        return json.loads(raw)
+    except json.JSONDecodeError:
+        repaired = _TRAILING_COMMA_RE.sub(r"\1", raw)
+        if repaired == raw:
+            raise
+        return json.loads(repaired)
+
+
+def strip_code_fences(text):
+    """Removes a leading ```json fence (and its closing fence) if present"""
+    clean = text.strip()
+    if clean.startswith('```'):
+        lines = clean.split('\n')
+        clean = '\n'.join(lines[1:-1] if lines[-1].strip() == '```' else lines[1:])
+    return clean
+
+
+class IncrementalSectionParser:
+    """
+    Streaming parser for a single top-level JSON object.
+
+    Feed it text chunks as they arrive; `feed` returns the (key, value) pairs
+    whose values completed in that chunk. Anything before the first `{`
+    (e.g. a code fence) is ignored. Sections whose JSON is malformed are
+    recorded in `errors` instead of raising.
+    """
+
+    def __init__(self):
+        self.buffer = ''
+        self.sections = {}
+        self.errors = {}
+        self.complete = False
+        self._pos = 0
+        self._depth = 0
+        self._started = False
+        self._in_string = False
+        self._escape = False
+        self._expect_key = True
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        emitted = []
+        buf = self.buffer
+        i = self._pos
+        while i < len(buf) and not self.complete:
+            c = buf[i]
+            if not self._started:
+                if c == '{':
+                    self._started = True
+                    self._depth = 1
+            elif self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == '\\':
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect_key and self._key_start is not None:
+                        self._key = self._load(buf[self._key_start:i + 1])
+                        self._key_start = None
+            elif c == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect_key:
+                    self._key_start = i
+            elif c in '{[':
+                self._depth += 1
+            elif c in '}]':
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    # Object/array value just closed
+                    self._emit(buf[self._value_start:i + 1], emitted)
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit(buf[self._value_start:i], emitted)
+                    self.complete = True
+            elif self._depth == 1:
+                if c == ':' and self._expect_key:
+                    self._expect_key = False
+                    self._value_start = i + 1
+                elif c == ',':
+                    if self._value_start is not None:
+                        self._emit(buf[self._value_start:i], emitted)
+                    self._expect_key = True
+            i += 1
+        self._pos = i
+        return emitted
+
+    def _emit(self, raw, emitted):
+        key = self._key
+        self._value_start = None
+        self._expect_key = True
+        if not isinstance(key, str):
+            return
+        try:
+            value = lenient_loads(raw)
+        except json.JSONDecodeError as e:
+            self.errors[key] = str(e)
+            return
+        self.sections[key] = value
+        emitted.append((key, value))
+
+    @staticmethod
+    def _load(raw):
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
+
+def salvage_sections(text):
+    """
+    Parses as much of a profile response as possible.
+
+    Returns:
+        (sections, errors) - every well-formed top-level section, and a
+        {section: reason} dict for sections that were malformed. A section
+        cut off by truncation appears in neither.
+    """
+    clean = strip_code_fences(text)
+    try:
+        data = lenient_loads(clean)
+        if isinstance(data, dict):
+            return data, {}
+    except json.JSONDecodeError:
+        pass
+
+    parser = IncrementalSectionParser()
+    parser.feed(clean)
+    return dict(parser.sections), dict(parser.errors)
@@ -0,0 +1,321 @@
+"""
+Research Providers - Pluggable search and synthesis backends
+
+The research pipeline talks to a SearchProvider (web search) and a
+SynthesisProvider (LLM). Real clients are only constructed on first use, so
+importing the pipeline needs no API keys. Setting RESEARCH_PROVIDER=fake
+swaps in the in-process stand-ins, which return canned data and need no
+network.
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+
+from instrumentation import record_llm_usage
+
+ANTHROPIC_MODEL = os.environ.get("ANTHROPIC_MODEL", "claude-sonnet-4-20250514")
+
+
+class SearchProvider:
+    """Web search backend used by research_agent.search_query"""
+
+    name = "base"
+
+    def search(self, query, search_depth="advanced", max_results=5):
+        """Returns a list of {'title', 'url', 'content'} result dicts"""
+        raise NotImplementedError
+
+
+class SynthesisProvider:
+    """LLM backend that turns the research context into profile JSON text"""
+
+    name = "base"
+    model_name = "unknown"
+
+    def synthesize(self, system_prompt, user_prompt, inputs):
+        """
+        Args:
+            system_prompt: ChatPromptTemplate-style system message
+            user_prompt: ChatPromptTemplate-style user message with {placeholders}
+            inputs: Values for the user_prompt placeholders
+
+        Returns:
+            Raw model output text
+        """
+        raise NotImplementedError
+
+    def stream(self, system_prompt, user_prompt, inputs):
+        """Yields the model output as text chunks (default: one chunk)"""
+        yield self.synthesize(system_prompt, user_prompt, inputs)
+
+
+class TavilySearchProvider(SearchProvider):
+    name = "tavily"
+
+    def __init__(self, api_key=None):
+        from tavily import TavilyClient
+
+        api_key = api_key or os.environ.get("TAVILY_API_KEY")
+        if not api_key:
+            raise ValueError("TAVILY_API_KEY not found in environment variables.")
+        self.client = TavilyClient(api_key=api_key)
+
+    def search(self, query, search_depth="advanced", max_results=5):
+        results = self.client.search(
+            query=query,
+            search_depth=search_depth,
+            max_results=max_results,
+            include_raw_content=False
+        )
+        return results.get('results', []) if results else []
+
+
+class AnthropicSynthesisProvider(SynthesisProvider):
+    name = "anthropic"
+
+    def __init__(self, model=ANTHROPIC_MODEL, temperature=0.0, max_tokens=5000, api_key=None):
+        from langchain_anthropic import ChatAnthropic
+
+        if not (api_key or os.environ.get("ANTHROPIC_API_KEY")):
+            raise ValueError("ANTHROPIC_API_KEY not found in environment variables.")
+        kwargs = {'api_key': api_key} if api_key else {}
+        self.model_name = model
+        self.llm = ChatAnthropic(
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            **kwargs
+        )
+
+    def build_chain(self, system_prompt, user_prompt):
+        from langchain_core.prompts import ChatPromptTemplate
+
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt),
+            ("user", user_prompt)
+        ])
+        return prompt | self.llm
+
+    def synthesize(self, system_prompt, user_prompt, inputs):
+        message = self.build_chain(system_prompt, user_prompt).invoke(inputs)
+        _record_usage(message)
+        return _message_text(message)
+
+    def stream(self, system_prompt, user_prompt, inputs):
+        usage = {'input_tokens': 0, 'output_tokens': 0}
+        for chunk in self.build_chain(system_prompt, user_prompt).stream(inputs):
+            for key, value in (getattr(chunk, 'usage_metadata', None) or {}).items():
+                if key in usage:
+                    usage[key] += value or 0
+            text = _message_text(chunk)
+            if text:
+                yield text
+        record_llm_usage(usage['input_tokens'], usage['output_tokens'])
+
+
+def _message_text(message):
+    """Plain text of a chat message whose content may be a list of blocks"""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return ''.join(
+        block.get('text', '') if isinstance(block, dict) else str(block)
+        for block in content
+    )
+
+
+def _record_usage(message):
+    usage = getattr(message, 'usage_metadata', None) or {}
+    record_llm_usage(usage.get('input_tokens', 0), usage.get('output_tokens', 0))
+
+
+# --- OFFLINE STAND-INS ---
+
+def _stable_int(text):
+    return int(hashlib.md5(text.encode('utf-8')).hexdigest()[:8], 16)
+
+
+class FakeSearchProvider(SearchProvider):
+    """
+    Deterministic canned search results for offline runs and load tests.
+
+    `latency` (seconds) is slept per call to mimic network round-trips.
+    """
+
+    name = "fake"
+
+    SNIPPETS = [
+        "The company announced a digital transformation program and a merger with a regional competitor.",
+        "Employees report a hybrid work model with remote options; Glassdoor rating 3.9/5.",
+        "Job description: HRIS Administrator supporting Workday and Microsoft Teams rollout.",
+        "Headquartered in Omaha, Nebraska with 5000+ employees across multiple locations.",
+        "The Director of Internal Communications leads employee experience for frontline clinical staff.",
+        "Fiscal year ends June 30 according to the annual investor relations report.",
+        "The organization uses SharePoint and Slack for distributed teams and engagement metrics.",
+    ]
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def search(self, query, search_depth="advanced", max_results=5):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        seed = _stable_int(' '.join(query.split()))
+        results = []
+        for i in range(max_results):
+            n = (seed + i) % len(self.SNIPPETS)
+            results.append({
+                'title': f"Result {i + 1} for query {seed % 1000}",
+                'url': f"https://example.com/{seed % 1000}/{n}",
+                'content': self.SNIPPETS[n],
+            })
+        return results
+
+
+class FakeSynthesisProvider(SynthesisProvider):
+    """Returns a canned, schema-complete profile for the target company"""
+
+    name = "fake"
+    model_name = "fake-synthesis"
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def synthesize(self, system_prompt, user_prompt, inputs):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text = json.dumps(canned_profile(inputs.get('company_name', 'Example Co'),
+                                         inputs.get('website', 'example.com')))
+        # Rough 4-chars-per-token estimate so offline benchmarks report usage
+        record_llm_usage((len(system_prompt) + len(user_prompt.format(**inputs))) // 4, len(text) // 4)
+        return text
+
+    def stream(self, system_prompt, user_prompt, inputs, chunk_size=40):
+        """Emits the canned profile in small chunks, spreading `latency` across them"""
+        latency, self.latency = self.latency, 0.0
+        try:
+            text = self.synthesize(system_prompt, user_prompt, inputs)
+        finally:
+            self.latency = latency
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        for chunk in chunks:
+            if latency:
+                time.sleep(latency / len(chunks))
+            yield chunk
+
+
+def canned_profile(company_name, website_url):
+    """A fully populated profile in the shape the synthesis prompt asks for"""
+    site = f"https://{website_url}" if not str(website_url).startswith('http') else website_url
+    return {
+        'snapshot': {
+            'industry': 'Healthcare',
+            'size': '5000+ employees',
+            'location': 'Omaha, NE',
+            'fiscal_year': {'value': 'Ends Jun 30', 'source_url': f"{site}/investors"},
+            'glassdoor_score': {'value': '3.9/5', 'source_url': 'https://www.glassdoor.com/'},
+            'tech_stack': [
+                {'tool': 'Workday', 'category': 'HRIS', 'source_url': f"{site}/careers"},
+                {'tool': 'Microsoft Teams', 'category': 'Collaboration', 'source_url': f"{site}/careers"},
+                {'tool': 'SharePoint', 'category': 'Intranet', 'source_url': f"{site}/careers"},
+            ],
+            'change_events': [
+                {'event': f"{company_name} announced a merger and digital transformation program",
+                 'source_url': f"{site}/news"},
+            ],
+        },
+        'openers': [
+            {'label': 'The Strategy Hook',
+             'script': f"I saw {company_name} is merging - how are you keeping frontline staff informed?"},
+            {'label': 'The Tech Hook',
+             'script': "With Workday and Teams in place, how do you measure reach beyond the desk?"},
+        ],
+        'why_now': [
+            {'title': 'Merger Integration',
+             'description': 'A merger creates change management and leadership communication needs.',
+             'source_url': f"{site}/news"},
+            {'title': 'Distributed Workforce',
+             'description': 'Clinical staff across multiple locations need mobile-friendly updates.',
+             'source_url': f"{site}/about"},
+        ],
+        'personas': [
+            {'name': 'Jane Doe', 'role': 'Director of Internal Communications',
+             'email': 'Unknown', 'linkedin_url': None, 'is_named_person': True,
+             'goals': ['Improve engagement metrics', 'Reach deskless employees'],
+             'fears': ['Messages lost during the merger', 'No analytics on reach']},
+        ],
+        'angles': [
+            {'title': 'Frontline Reach', 'description': 'SMS and mobile pages for clinical staff.',
+             'metric': 'Open rate'},
+        ],
+    }
+
+
+# --- REGISTRY ---
+
+PROVIDER_MODE = os.environ.get("RESEARCH_PROVIDER", "live").lower()
+# Simulated per-call latency (seconds) for the fake providers
+FAKE_LATENCY = float(os.environ.get("FAKE_PROVIDER_LATENCY", "0"))
+
+_search_provider = None
+_synthesis_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_search_provider():
+    """Returns the active SearchProvider, constructing it on first use"""
+    global _search_provider
+    with _provider_lock:
+        if _search_provider is None:
+            _search_provider = FakeSearchProvider(FAKE_LATENCY) if PROVIDER_MODE == 'fake' else TavilySearchProvider()
+    return _search_provider
+
+
+def get_synthesis_provider():
+    """Returns the active SynthesisProvider, constructing it on first use"""
+    global _synthesis_provider
+    with _provider_lock:
+        if _synthesis_provider is None:
+            _synthesis_provider = FakeSynthesisProvider(FAKE_LATENCY) if PROVIDER_MODE == 'fake' else AnthropicSynthesisProvider()
+    return _synthesis_provider
+
+
+def set_search_provider(provider):
+    """Overrides the SearchProvider (None resets to lazy default construction)"""
+    global _search_provider
+    with _provider_lock:
+        _search_provider = provider
+
+
+def set_synthesis_provider(provider):
+    """Overrides the SynthesisProvider (None resets to lazy default construction)"""
+    global _synthesis_provider
+    with _provider_lock:
+        _synthesis_provider = provider
+
+
+def set_providers(search_provider, synthesis_provider):
+    """
+    Overrides both providers at once.
+
+    Returns:
+        The previous (search_provider, synthesis_provider) overrides, which
+        may be None, so callers can restore them
+    """
+    global _search_provider, _synthesis_provider
+    with _provider_lock:
+        previous = (_search_provider, _synthesis_provider)
+        _search_provider, _synthesis_provider = search_provider, synthesis_provider
+    return previous
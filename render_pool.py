@@ -0,0 +1,318 @@
+"""
+Render Pool - Warm worker processes for CPU-bound PDF rendering
+
+WeasyPrint layout holds the GIL, so renders from batch jobs or concurrent
+Streamlit sessions serialize inside one process. RenderPool keeps a fixed set
+of worker processes that import WeasyPrint and prepare fonts, CSS and the logo
+once, then render jobs sent to them:
+
+    with RenderPool(workers=4, logo_path='assets/workshop_logo.png') as pool:
+        future = pool.submit(structured_data, 'Acme')          # -> PDF bytes
+        pool.submit(structured_data, 'Acme', out_path='acme.pdf')  # -> path
+        pool.submit_profile('acme.json', 'Acme', out_path='acme.pdf')  # worker reads the JSON
+
+`submit` blocks once `max_pending` jobs are queued (backpressure), a job that
+runs past `job_timeout` has its worker killed and fails with RenderTimeout,
+and each worker is replaced with a fresh process after `max_jobs_per_worker`
+renders to cap memory growth.
+"""
+
+import os
+import json
+import queue
+import atexit
+import threading
+import multiprocessing
+from concurrent.futures import Future
+from instrumentation import PROCESS_ROLE
+
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", os.cpu_count() or 2))
+PDF_JOB_TIMEOUT = float(os.environ.get("PDF_JOB_TIMEOUT", "120"))
+PDF_WORKER_MAX_JOBS = int(os.environ.get("PDF_WORKER_MAX_JOBS", "100"))
+# Workers in the process-wide pool that serves interactive (Streamlit) renders
+PDF_SHARED_WORKERS = int(os.environ.get("PDF_SHARED_WORKERS", "2"))
+
+
+class RenderError(RuntimeError):
+    """A render failed inside a worker process"""
+
+
+class RenderTimeout(RenderError):
+    """A render ran past the job timeout; its worker was terminated"""
+
+
+def _worker_main(conn, logo_path, optimized, role):
+    """Worker process loop: warm up once, then render jobs until told to stop"""
+    from instrumentation import set_process_role
+    set_process_role(role)
+    from pdf_generator import get_renderer, PDF_OPTIMIZE
+
+    renderer = get_renderer()
+    renderer.stylesheet()
+    renderer.logo(logo_path, PDF_OPTIMIZE if optimized is None else optimized)
+    conn.send(('ready', os.getpid()))
+
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            break
+        if job is None:
+            break
+        structured_data, profile_path, company_name, job_logo_path, out_path, options = job
+        options = dict({'optimized': optimized}, **options)
+        try:
+            if structured_data is None:
+                with open(profile_path, encoding='utf-8') as f:
+                    structured_data = json.load(f)
+            if out_path:
+                # Streamed straight to disk; only the path crosses the pipe
+                renderer.render(structured_data, company_name, logo_path=job_logo_path,
+                                output=out_path, **options)
+                conn.send(('ok', out_path))
+            else:
+                pdf_file = renderer.render(structured_data, company_name, logo_path=job_logo_path, **options)
+                conn.send(('ok', pdf_file.getvalue()))
+        except Exception as e:
+            conn.send(('error', f"{type(e).__name__}: {e}"))
+    conn.close()
+
+
+class _WorkerSlot:
+    """Owns one worker process and the thread that feeds it jobs"""
+
+    def __init__(self, pool, index):
+        self.pool = pool
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.jobs_done = 0
+        self.ready = False
+        self.recycled = 0
+        self.killed = 0
+        self.thread = threading.Thread(target=self._run, name=f"render-slot-{index}", daemon=True)
+
+    def start_process(self):
+        parent_conn, child_conn = self.pool._ctx.Pipe()
+        self.process = self.pool._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self.pool.logo_path, self.pool.optimized, f"{PROCESS_ROLE}-render-{self.index}"),
+            name=f"pdf-worker-{self.index}", daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.jobs_done = 0
+        self.ready = False
+
+    def wait_ready(self):
+        """Blocks until the worker has finished warming up; kills it if it never does"""
+        try:
+            if self.conn.poll(self.pool.startup_timeout):
+                self.conn.recv()
+                self.ready = True
+                return
+            reason = f"did not start within {self.pool.startup_timeout}s"
+        except (EOFError, OSError) as e:
+            # Died while warming up (broken WeasyPrint/font setup, OOM)
+            reason = f"died during startup: {str(e) or type(e).__name__}"
+        self.stop_process(kill=True)
+        raise RenderError(f"PDF worker {self.index} {reason}")
+
+    def stop_process(self, kill=False):
+        if self.process is None:
+            return
+        if kill:
+            self.process.terminate()
+        else:
+            try:
+                self.conn.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+        self.process = None
+        self.conn = None
+
+    def _run(self):
+        while True:
+            job = self.pool._jobs.get()
+            if job is None:
+                self.stop_process()
+                return
+            future, payload = job
+            if not future.set_running_or_notify_cancel():
+                self.pool._slots_free.release()
+                continue
+            result = error = None
+            try:
+                if self.process is None:
+                    self.start_process()
+                if not self.ready:
+                    self.wait_ready()
+                result = self._render(payload)
+            except Exception as e:
+                error = e
+            # Free the slot before waking the submitter, so it can queue the next job at once
+            self.pool._slots_free.release()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+            if self.process is not None and self.jobs_done >= self.pool.max_jobs_per_worker:
+                # Recycle now so the replacement is warm before the next job
+                self.stop_process()
+                self.start_process()
+                self.recycled += 1
+
+    def _render(self, payload):
+        try:
+            self.conn.send(payload)
+            if not self.conn.poll(self.pool.job_timeout):
+                self.stop_process(kill=True)
+                self.killed += 1
+                raise RenderTimeout(f"PDF render for {payload[2]} exceeded {self.pool.job_timeout}s")
+            status, result = self.conn.recv()
+        except (EOFError, BrokenPipeError, OSError) as e:
+            self.stop_process(kill=True)
+            self.killed += 1
+            raise RenderError(f"PDF worker {self.index} died: {e}")
+        self.jobs_done += 1
+        if status != 'ok':
+            raise RenderError(result)
+        return result
+
+
+class RenderPool:
+    """
+    Fixed pool of warm PDF worker processes.
+
+    Args:
+        workers: Worker processes (default PDF_WORKERS)
+        logo_path: Logo warmed in every worker and used when a job gives none
+        job_timeout: Seconds a single render may take (default PDF_JOB_TIMEOUT)
+        max_jobs_per_worker: Renders before a worker is replaced (default PDF_WORKER_MAX_JOBS)
+        max_pending: Jobs queued or running before `submit` blocks (default 2 x workers)
+        optimized: Render optimized PDFs (default: PDF_OPTIMIZE in the workers)
+        start_method: multiprocessing start method; 'spawn' avoids forking a
+            threaded parent such as Streamlit
+    """
+
+    def __init__(self, workers=None, logo_path=None, job_timeout=None, max_jobs_per_worker=None,
+                 max_pending=None, optimized=None, start_method='spawn', startup_timeout=60):
+        self.workers = max(1, workers or PDF_WORKERS)
+        self.logo_path = logo_path
+        self.optimized = optimized
+        self.job_timeout = job_timeout or PDF_JOB_TIMEOUT
+        self.max_jobs_per_worker = max(1, max_jobs_per_worker or PDF_WORKER_MAX_JOBS)
+        self.max_pending = max(self.workers, max_pending or 2 * self.workers)
+        self.startup_timeout = startup_timeout
+        self._ctx = multiprocessing.get_context(start_method)
+        self._jobs = queue.Queue()
+        self._slots_free = threading.BoundedSemaphore(self.max_pending)
+        self._closed = False
+
+        self._slots = [_WorkerSlot(self, i) for i in range(self.workers)]
+        try:
+            for slot in self._slots:
+                slot.start_process()
+            for slot in self._slots:
+                slot.wait_ready()
+        except BaseException:
+            # Don't leave the workers that did start running
+            for slot in self._slots:
+                slot.stop_process(kill=True)
+            raise
+        for slot in self._slots:
+            slot.thread.start()
+        print(f"🖨️ Render pool ready: {self.workers} warm workers")
+
+    def submit(self, structured_data, company_name, out_path=None, logo_path=None, timeout=None,
+               optimized=None, layout=None):
+        """
+        Queues a render job, blocking while `max_pending` jobs are in flight.
+
+        Args:
+            out_path: Write the PDF here (atomically) and resolve to the path;
+                without it the future resolves to the PDF bytes
+            logo_path: Overrides the pool's logo for this job
+            timeout: Seconds to wait for queue space before raising queue.Full
+            optimized, layout: Override the pool's optimized setting and the
+                default layout for this job
+
+        Returns:
+            concurrent.futures.Future
+        """
+        return self._submit(structured_data, None, company_name, out_path, logo_path, timeout,
+                            optimized=optimized, layout=layout)
+
+    def submit_profile(self, profile_path, company_name, out_path=None, logo_path=None, timeout=None,
+                       optimized=None, layout=None):
+        """
+        Like submit, but the worker reads the profile from a saved JSON file,
+        so the parent never holds or pickles it.
+        """
+        return self._submit(None, profile_path, company_name, out_path, logo_path, timeout,
+                            optimized=optimized, layout=layout)
+
+    def _submit(self, structured_data, profile_path, company_name, out_path, logo_path, timeout, **options):
+        if self._closed:
+            raise RuntimeError("RenderPool is closed")
+        if not self._slots_free.acquire(timeout=timeout):
+            raise queue.Full(f"Render queue full ({self.max_pending} jobs in flight)")
+        future = Future()
+        job_logo = logo_path if logo_path is not None else self.logo_path
+        options = {key: value for key, value in options.items() if value is not None}
+        self._jobs.put((future, (structured_data, profile_path, company_name, job_logo, out_path, options)))
+        return future
+
+    def render(self, structured_data, company_name, out_path=None, logo_path=None, optimized=None, layout=None):
+        """Blocking submit: returns PDF bytes, or the path when `out_path` is given"""
+        return self.submit(structured_data, company_name, out_path=out_path, logo_path=logo_path,
+                           optimized=optimized, layout=layout).result()
+
+    def stats(self):
+        return {
+            'workers': self.workers,
+            'queued': self._jobs.qsize(),
+            'max_pending': self.max_pending,
+            'recycled': sum(slot.recycled for slot in self._slots),
+            'killed': sum(slot.killed for slot in self._slots),
+        }
+
+    def close(self):
+        """Finishes queued jobs, then stops every worker"""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._slots:
+            self._jobs.put(None)
+        for slot in self._slots:
+            slot.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+
+def get_shared_pool():
+    """
+    The process-wide pool for interactive renders (the Streamlit app),
+    started on first use with PDF_SHARED_WORKERS workers and closed at exit.
+    """
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = RenderPool(workers=PDF_SHARED_WORKERS)
+            atexit.register(_shared_pool.close)
+    return _shared_pool
@@ -1,38 +1,215 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
-from tavily import TavilyClient
-from langchain_anthropic import ChatAnthropic
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from research_cache import get_search_cache, get_synthesis_cache
+from providers import get_search_provider, get_synthesis_provider
+from context_builder import build_context, format_context
+from instrumentation import span, submit
+from profile_parser import PROFILE_SECTIONS, IncrementalSectionParser, salvage_sections, strip_code_fences
 
 load_dotenv()
 
-tavily_api_key = os.environ.get("TAVILY_API_KEY")
-anthropic_api_key = os.environ.get("ANTHROPIC_API_KEY")
+# Upper bound on concurrent Tavily searches per account (one per query by default)
+SEARCH_MAX_WORKERS = int(os.environ.get("SEARCH_MAX_WORKERS", "7"))
 
-if not tavily_api_key:
-    raise ValueError("TAVILY_API_KEY not found in environment variables.")
-if not anthropic_api_key:
-    raise ValueError("ANTHROPIC_API_KEY not found in environment variables.")
+# SYSTEM PROMPT UPDATED WITH LIMITS AND SOURCE RULES
+SYSTEM_PROMPT = """You are an expert Account-Based Marketing researcher for Workshop.
 
-tavily = TavilyClient(api_key=tavily_api_key)
-llm = ChatAnthropic(
-    model="claude-sonnet-4-20250514",
-    temperature=0.0,
-    max_tokens=5000,
-)
+CRITICAL RULES:
+1. **NO HALLUCINATIONS**: If a specific fact isn't found, return "Unknown".
+2. **SOURCE LINKS**: You MUST provide the `source_url` for every data point found.
 
-def get_company_data(company_name, website_url):
+DATA EXTRACTION TASKS:
+
+1. **WHY NOW (Strategic Focus)**: 
+   - **LIMIT**: Output exactly TWO (2) high-impact strategic reasons. No more.
+   - **CRITERIA**: Prioritize Strategic Shifts, M&A, or Major Projects over awards.
+
+2. **TARGET BUYERS**: 
+   - Find specific Internal Comms or Employee Experience leaders.
+   - **Do not** target the CEO unless <100 employees.
+
+3. **TECH STACK VERIFICATION**: 
+   - **STRICT SOURCE RULE**: The `source_url` for a tool MUST be a specific page proving usage (e.g., a Job Listing for "HRIS Admin", a Case Study, or an Engineering Blog post).
+   - **REJECT**: Generic homepages (e.g., "www.slack.com") or generic software directories.
+   - **SEARCH**: Look for Microsoft Teams, SharePoint, Workday, UKG.
+
+OUTPUT STRUCTURE (JSON ONLY):
+{{
+  "snapshot": {{
+    "industry": "string",
+    "size": "string",
+    "location": "string",
+    "fiscal_year": {{ "value": "e.g. Ends Dec 31", "source_url": "https://..." }},
+    "glassdoor_score": {{ "value": "e.g. 4.2/5", "source_url": "https://..." }},
+    "tech_stack": [
+      {{ "tool": "Workday", "category": "HRIS", "source_url": "https://..." }}
+    ],
+    "change_events": [
+      {{ "event": "...", "source_url": "https://..." }}
+    ]
+  }},
+  "openers": [
+    {{ "label": "The Strategy Hook", "script": "..." }},
+    {{ "label": "The Tech Hook", "script": "..." }}
+  ],
+  "why_now": [
+    {{
+      "title": "Title (e.g. 'Nuclear Market Expansion')",
+      "description": "Description relating to comms needs...",
+      "source_url": "https://..."
+    }},
+    {{
+      "title": "Title 2",
+      "description": "...",
+      "source_url": "..."
+    }}
+  ],
+  "personas": [
+    {{
+      "name": "Jane Doe",
+      "role": "Director of Internal Comms",
+      "email": "jane.doe@company.com OR 'Unknown'",
+      "linkedin_url": "https://linkedin.com/in/...",
+      "is_named_person": true,
+      "goals": ["..."],
+      "fears": ["..."]
+    }}
+  ],
+  "angles": [
+    {{
+      "title": "Angle Title",
+      "description": "...",
+      "metric": "..."
+    }}
+  ]
+}}
+"""
+
+USER_PROMPT = """Target Company: {company_name}
+Website: {website}
+
+Research with Sources:
+{context}
+
+Generate the structured JSON profile with accurate source citations:"""
+
+# --- FAN-OUT SYNTHESIS ---
+# Each section is generated by its own smaller LLM call, fed only the sources
+# from the queries that inform it.
+
+SYNTHESIS_MODE = os.environ.get("SYNTHESIS_MODE", "single").lower()
+SECTION_MAX_RETRIES = int(os.environ.get("SECTION_MAX_RETRIES", "2"))
+
+SECTION_SYSTEM_PROMPT = """You are an expert Account-Based Marketing researcher for Workshop.
+
+CRITICAL RULES:
+1. **NO HALLUCINATIONS**: If a specific fact isn't found, return "Unknown".
+2. **SOURCE LINKS**: You MUST provide the `source_url` for every data point found.
+
+TASK:
+{task}
+
+OUTPUT STRUCTURE (JSON ONLY):
+{schema}
+"""
+
+SECTION_SPECS = {
+    'snapshot': {
+        'query_types': ['general', 'tech', 'culture', 'strategy'],
+        'task': """Build the company snapshot.
+- **TECH STACK VERIFICATION**: The `source_url` for a tool MUST be a specific page proving usage (e.g., a Job Listing for "HRIS Admin", a Case Study, or an Engineering Blog post). **REJECT** generic homepages or software directories. Look for Microsoft Teams, SharePoint, Workday, UKG.""",
+        'schema': """{{
+  "snapshot": {{
+    "industry": "string",
+    "size": "string",
+    "location": "string",
+    "fiscal_year": {{ "value": "e.g. Ends Dec 31", "source_url": "https://..." }},
+    "glassdoor_score": {{ "value": "e.g. 4.2/5", "source_url": "https://..." }},
+    "tech_stack": [
+      {{ "tool": "Workday", "category": "HRIS", "source_url": "https://..." }}
+    ],
+    "change_events": [
+      {{ "event": "...", "source_url": "https://..." }}
+    ]
+  }}
+}}""",
+    },
+    'openers': {
+        'query_types': ['strategy', 'tech', 'general'],
+        'task': """Write two short cold-call openers for a BDR: one hooked on a strategic initiative, one on the tech stack.""",
+        'schema': """{{
+  "openers": [
+    {{ "label": "The Strategy Hook", "script": "..." }},
+    {{ "label": "The Tech Hook", "script": "..." }}
+  ]
+}}""",
+    },
+    'why_now': {
+        'query_types': ['strategy', 'general'],
+        'task': """**WHY NOW (Strategic Focus)**:
+- **LIMIT**: Output exactly TWO (2) high-impact strategic reasons. No more.
+- **CRITERIA**: Prioritize Strategic Shifts, M&A, or Major Projects over awards.""",
+        'schema': """{{
+  "why_now": [
+    {{
+      "title": "Title (e.g. 'Nuclear Market Expansion')",
+      "description": "Description relating to comms needs...",
+      "source_url": "https://..."
+    }}
+  ]
+}}""",
+    },
+    'personas': {
+        'query_types': ['people_internal', 'people_corporate', 'people_linkedin'],
+        'task': """**TARGET BUYERS**:
+- Find specific Internal Comms or Employee Experience leaders.
+- **Do not** target the CEO unless <100 employees.""",
+        'schema': """{{
+  "personas": [
+    {{
+      "name": "Jane Doe",
+      "role": "Director of Internal Comms",
+      "email": "jane.doe@company.com OR 'Unknown'",
+      "linkedin_url": "https://linkedin.com/in/...",
+      "is_named_person": true,
+      "goals": ["..."],
+      "fears": ["..."]
+    }}
+  ]
+}}""",
+    },
+    'angles': {
+        'query_types': ['strategy', 'culture', 'general'],
+        'task': """Propose messaging angles for selling an internal communications platform to this company.""",
+        'schema': """{{
+  "angles": [
+    {{
+      "title": "Angle Title",
+      "description": "...",
+      "metric": "..."
+    }}
+  ]
+}}""",
+    },
+}
+
+SECTION_USER_PROMPT = """Target Company: {company_name}
+Website: {website}
+
+Research with Sources:
+{context}
+
+Generate the JSON for this section with accurate source citations:"""
+
+
+def build_research_queries(company_name, website_url):
     """
-    Orchestrates comprehensive research with source citations.
-    Returns structured JSON with embedded links to sources.
+    Returns the ordered mapping of query_type -> Tavily query for an account.
     """
-    
-    print(f"🕵️ Starting deep research on {company_name}...")
-    
     # Updated queries: Added 'strategy' to find the high-quality BDR angles
-    queries = {
+    return {
         'general': f"""
             {company_name} company profile headquarters employee count
             fiscal year end date financial calendar investor relations
@@ -65,168 +242,395 @@ def get_company_data(company_name, website_url):
             site:linkedin.com/in/ {company_name} "internal communications" OR "corporate communications"
         """
     }
-    
-    all_sources = []
-    
-    try:
-        for query_type, query in queries.items():
-            print(f"  📡 Searching: {query_type}...")
-            # Use 5 results normally, 7 for people to ensure we find contacts
-            max_res = 7 if 'people' in query_type else 5
-            
-            results = tavily.search(
-                query=query, 
-                search_depth="advanced",
-                max_results=max_res,
-                include_raw_content=False
+
+
+def search_query(query_type, query):
+    """
+    Runs a single web search and returns its results as source records
+    tagged with the query_type.
+    """
+    # Use 5 results normally, 7 for people to ensure we find contacts
+    max_res = 7 if 'people' in query_type else 5
+    search_depth = "advanced"
+
+    cache = get_search_cache()
+    raw_results = cache.get_results(query, search_depth, max_res) if cache else None
+
+    if raw_results is not None:
+        print(f"  💾 Cache hit: {query_type}")
+    else:
+        print(f"  📡 Searching: {query_type}...")
+        with span(f"search:{query_type}"):
+            raw_results = get_search_provider().search(
+                query, search_depth=search_depth, max_results=max_res
             )
-            
-            if results and 'results' in results:
-                for r in results['results']:
-                    all_sources.append({
-                        'title': r.get('title', 'N/A'),
-                        'url': r.get('url', ''),
-                        'content': r.get('content', ''),
-                        'query_type': query_type
-                    })
-        
-        # Build context
-        context_with_sources = ""
-        for idx, source in enumerate(all_sources, 1):
-            context_with_sources += f"\n\n[SOURCE {idx}]\n"
-            context_with_sources += f"URL: {source['url']}\n"
-            context_with_sources += f"Title: {source['title']}\n"
-            context_with_sources += f"Type: {source['query_type']}\n"
-            context_with_sources += f"Content: {source['content']}\n"
-        
-    except Exception as e:
-        print(f"⚠️ Error during research: {e}")
-        context_with_sources = f"Limited information available for {company_name}."
-        all_sources = []
-    
-    # SYSTEM PROMPT UPDATED WITH LIMITS AND SOURCE RULES
-    system_prompt = """You are an expert Account-Based Marketing researcher for Workshop.
+        if cache:
+            cache.put_results(query_type, query, search_depth, max_res, raw_results)
 
-    CRITICAL RULES:
-    1. **NO HALLUCINATIONS**: If a specific fact isn't found, return "Unknown".
-    2. **SOURCE LINKS**: You MUST provide the `source_url` for every data point found.
-    
-    DATA EXTRACTION TASKS:
+    sources = []
+    if raw_results:
+        for r in raw_results:
+            sources.append({
+                'title': r.get('title', 'N/A'),
+                'url': r.get('url', ''),
+                'content': r.get('content', ''),
+                'score': r.get('score'),
+                'query_type': query_type
+            })
+    return sources
 
-    1. **WHY NOW (Strategic Focus)**: 
-       - **LIMIT**: Output exactly TWO (2) high-impact strategic reasons. No more.
-       - **CRITERIA**: Prioritize Strategic Shifts, M&A, or Major Projects over awards.
 
-    2. **TARGET BUYERS**: 
-       - Find specific Internal Comms or Employee Experience leaders.
-       - **Do not** target the CEO unless <100 employees.
+def gather_sources(queries, max_workers=None):
+    """
+    Runs all research queries concurrently and returns the combined sources.
 
-    3. **TECH STACK VERIFICATION**: 
-       - **STRICT SOURCE RULE**: The `source_url` for a tool MUST be a specific page proving usage (e.g., a Job Listing for "HRIS Admin", a Case Study, or an Engineering Blog post).
-       - **REJECT**: Generic homepages (e.g., "www.slack.com") or generic software directories.
-       - **SEARCH**: Look for Microsoft Teams, SharePoint, Workday, UKG.
+    Args:
+        queries: Ordered mapping of query_type -> query text
+        max_workers: Concurrent search limit (defaults to SEARCH_MAX_WORKERS)
 
-    OUTPUT STRUCTURE (JSON ONLY):
-    {{
-      "snapshot": {{
-        "industry": "string",
-        "size": "string",
-        "location": "string",
-        "fiscal_year": {{ "value": "e.g. Ends Dec 31", "source_url": "https://..." }},
-        "glassdoor_score": {{ "value": "e.g. 4.2/5", "source_url": "https://..." }},
-        "tech_stack": [
-          {{ "tool": "Workday", "category": "HRIS", "source_url": "https://..." }}
-        ],
-        "change_events": [
-          {{ "event": "...", "source_url": "https://..." }}
-        ]
-      }},
-      "openers": [
-        {{ "label": "The Strategy Hook", "script": "..." }},
-        {{ "label": "The Tech Hook", "script": "..." }}
-      ],
-      "why_now": [
-        {{
-          "title": "Title (e.g. 'Nuclear Market Expansion')",
-          "description": "Description relating to comms needs...",
-          "source_url": "https://..."
-        }},
-        {{
-          "title": "Title 2",
-          "description": "...",
-          "source_url": "..."
-        }}
-      ],
-      "personas": [
-        {{
-          "name": "Jane Doe",
-          "role": "Director of Internal Comms",
-          "email": "jane.doe@company.com OR 'Unknown'",
-          "linkedin_url": "https://linkedin.com/in/...",
-          "is_named_person": true,
-          "goals": ["..."],
-          "fears": ["..."]
-        }}
-      ],
-      "angles": [
-        {{
-          "title": "Angle Title",
-          "description": "...",
-          "metric": "..."
-        }}
-      ]
-    }}
+    Returns:
+        List of source dicts, grouped in the same order as `queries`.
+        A failed query only drops its own sources.
     """
+    if not queries:
+        return []
 
-    prompt = ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
-        ("user", """Target Company: {company_name}
-Website: {website}
+    workers = max(1, min(max_workers or SEARCH_MAX_WORKERS, len(queries)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            query_type: submit(pool, search_query, query_type, query)
+            for query_type, query in queries.items()
+        }
 
-Research with Sources:
-{context}
+    all_sources = []
+    for query_type, future in futures.items():
+        try:
+            all_sources.extend(future.result())
+        except Exception as e:
+            print(f"⚠️ Search failed for {query_type}: {e}")
+    return all_sources
 
-Generate the structured JSON profile with accurate source citations:""")
-    ])
+
+def prepare_research(company_name, website_url, max_workers=None):
+    """
+    Runs the search and context-assembly stages for an account.
+
+    Returns:
+        (inputs, all_sources, context_stats) where inputs are the values
+        for USER_PROMPT
+    """
+    queries = build_research_queries(company_name, website_url)
+    all_sources = gather_sources(queries, max_workers=max_workers)
     
-    chain = prompt | llm | StrOutputParser()
+    # Build context: merge duplicates and fit the token budget
+    with span("context_build"):
+        context_with_sources, all_sources, context_stats = build_context(all_sources)
+    if context_stats['tokens_saved'] > 0:
+        print(f"✂️ Context trimmed - {context_stats['tokens_saved']} tokens saved "
+              f"({context_stats['sources_in']} -> {context_stats['sources_out']} sources)")
+    
+    if not all_sources:
+        print("⚠️ No research results returned")
+        context_with_sources = f"Limited information available for {company_name}."
     
-    print("🧠 Synthesizing research with citations...")
-    json_output = chain.invoke({
+    inputs = {
         "company_name": company_name,
         "website": website_url,
         "context": context_with_sources
-    })
+    }
+    return inputs, all_sources, context_stats
+
+
+def lookup_synthesis(synthesizer, inputs, system_prompt=SYSTEM_PROMPT, user_prompt=USER_PROMPT):
+    """
+    Returns (cache_key, cached_profile); both are None when caching is
+    disabled, and the profile is None on a miss.
+    """
+    synthesis_cache = get_synthesis_cache()
+    if not synthesis_cache:
+        return None, None
+    synthesis_key = synthesis_cache.make_key(
+        system_prompt, synthesizer.model_name, user_prompt.format(**inputs)
+    )
+    return synthesis_key, synthesis_cache.get(synthesis_key)
+
+
+def store_synthesis(synthesis_key, structured_data):
+    synthesis_cache = get_synthesis_cache()
+    if synthesis_cache and synthesis_key:
+        synthesis_cache.put_profile(synthesis_key, structured_data)
+
+
+def validate_profile(structured_data):
+    """Fills any missing required section with its empty default"""
+    required_keys = ['snapshot', 'why_now', 'personas', 'angles']
+    for key in required_keys:
+        if key not in structured_data:
+            print(f"⚠️ Missing required key: {key}")
+            structured_data[key] = get_default_section(key)
+    return structured_data
+
+
+def attach_metadata(structured_data, company_name, website_url, all_sources, context_stats, **extra):
+    structured_data['_metadata'] = {
+        'company_name': company_name,
+        'website': website_url,
+        'sources_count': len(all_sources),
+        'all_sources': all_sources,
+        'context_stats': context_stats,
+        **extra
+    }
+    print(f"✅ Research complete - {len(all_sources)} sources analyzed")
+    return structured_data
+
+
+def synthesize_section(synthesizer, section, company_name, website_url, all_sources):
+    """
+    Generates one profile section from the sources scoped to it.
+
+    Retries up to SECTION_MAX_RETRIES times on API or JSON errors.
+
+    Returns:
+        The section value, or None if every attempt failed
+    """
+    spec = SECTION_SPECS[section]
+    scoped = [
+        s for s in all_sources
+        if set(s.get('query_types') or [s.get('query_type')]) & set(spec['query_types'])
+    ]
+    context = format_context(scoped or all_sources) or f"Limited information available for {company_name}."
+    inputs = {"company_name": company_name, "website": website_url, "context": context}
+    system_prompt = SECTION_SYSTEM_PROMPT.format(task=spec['task'], schema=spec['schema'])
+
+    synthesis_key, cached = lookup_synthesis(synthesizer, inputs, system_prompt, SECTION_USER_PROMPT)
+    if cached is not None and section in cached:
+        print(f"  💾 Synthesis cache hit: {section}")
+        return cached[section]
+
+    for attempt in range(1, SECTION_MAX_RETRIES + 2):
+        try:
+            print(f"  🧠 Synthesizing {section} ({len(scoped)} sources, attempt {attempt})...")
+            with span(f"llm:{section}"):
+                output = synthesizer.synthesize(system_prompt, SECTION_USER_PROMPT, inputs)
+            with span("json_parse"):
+                parsed = json.loads(strip_code_fences(output))
+            value = parsed[section] if isinstance(parsed, dict) and section in parsed else parsed
+            store_synthesis(synthesis_key, {section: value})
+            return value
+        except Exception as e:
+            print(f"  ⚠️ {section} synthesis failed (attempt {attempt}): {e}")
+    return None
+
+
+def synthesize_sections(synthesizer, company_name, website_url, all_sources, sections=None, max_workers=None):
+    """
+    Fans synthesis out into one concurrent LLM call per profile section.
+
+    Args:
+        sections: Section names to generate (defaults to all of SECTION_SPECS)
+
+    Returns:
+        (structured_data, failed_sections); failed sections get their
+        empty defaults instead of sinking the whole profile.
+    """
+    sections = list(sections or SECTION_SPECS)
+    results = dict(iter_sections(synthesizer, company_name, website_url, all_sources, sections, max_workers))
+
+    structured_data = {}
+    failed_sections = []
+    for section in sections:
+        value = results[section]
+        if value is None:
+            failed_sections.append(section)
+            value = get_default_section(section)
+        structured_data[section] = value
+    return structured_data, failed_sections
+
+
+def iter_sections(synthesizer, company_name, website_url, all_sources, sections=None, max_workers=None):
+    """
+    Runs the per-section LLM calls concurrently.
+
+    Yields:
+        (section_name, value) in completion order; value is None if the
+        section failed every attempt
+    """
+    sections = list(sections or SECTION_SPECS)
+    if not sections:
+        return
+    workers = max(1, min(max_workers or len(sections), len(sections)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            submit(pool, synthesize_section, synthesizer, section,
+                        company_name, website_url, all_sources): section
+            for section in sections
+        }
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def repair_profile(synthesizer, sections, errors, company_name, website_url, all_sources):
+    """
+    Re-requests only the sections that were malformed or missing from a
+    monolithic synthesis, using the targeted per-section prompts.
+
+    Returns:
+        (structured_data, repaired_sections, failed_sections)
+    """
+    structured_data = dict(sections)
+    broken = [key for key in PROFILE_SECTIONS if key not in structured_data]
+    if not broken:
+        return structured_data, [], []
+
+    for key in broken:
+        reason = errors.get(key, 'missing or truncated')
+        print(f"🔧 Repairing section {key}: {reason}")
+    repaired, failed_sections = synthesize_sections(
+        synthesizer, company_name, website_url, all_sources, sections=broken
+    )
+    structured_data.update(repaired)
+    repaired_sections = [key for key in broken if key not in failed_sections]
+    return structured_data, repaired_sections, failed_sections
+
+
+def get_company_data(company_name, website_url, max_workers=None, synthesis_mode=None):
+    """
+    Orchestrates comprehensive research with source citations.
+    Returns structured JSON with embedded links to sources.
+
+    synthesis_mode is 'single' (one prompt for the whole profile) or
+    'fanout' (concurrent per-section prompts); defaults to SYNTHESIS_MODE.
+    A per-stage timing summary is attached as _metadata['timings'].
+    """
+    with span("get_company_data", company=company_name) as trace:
+        structured_data = _research_company(company_name, website_url, max_workers, synthesis_mode)
+        structured_data['_metadata']['timings'] = trace.summary()
+    return structured_data
+
+
+def _research_company(company_name, website_url, max_workers, synthesis_mode):
+    print(f"🕵️ Starting deep research on {company_name}...")
+    
+    inputs, all_sources, context_stats = prepare_research(company_name, website_url, max_workers)
+    synthesizer = get_synthesis_provider()
     
-    try:
-        clean_json = json_output.strip()
-        if clean_json.startswith('```'):
-            lines = clean_json.split('\n')
-            clean_json = '\n'.join(lines[1:-1] if lines[-1].strip() == '```' else lines[1:])
+    if (synthesis_mode or SYNTHESIS_MODE) == 'fanout':
+        print("🧠 Synthesizing sections in parallel...")
+        structured_data, failed_sections = synthesize_sections(
+            synthesizer, company_name, website_url, all_sources
+        )
+        return attach_metadata(structured_data, company_name, website_url, all_sources,
+                               context_stats, failed_sections=failed_sections)
+    
+    synthesis_key, structured_data = lookup_synthesis(synthesizer, inputs)
+    
+    if structured_data is not None:
+        print("💾 Synthesis cache hit - skipping LLM call")
+    else:
+        print("🧠 Synthesizing research with citations...")
+        with span("llm:synthesis"):
+            json_output = synthesizer.synthesize(SYSTEM_PROMPT, USER_PROMPT, inputs)
         
-        structured_data = json.loads(clean_json)
+        with span("json_parse"):
+            sections, errors = salvage_sections(json_output)
+        for key, error in errors.items():
+            print(f"❌ JSON parsing error in {key}: {error}")
         
-        # Validate required fields
-        required_keys = ['snapshot', 'why_now', 'personas', 'angles']
-        for key in required_keys:
-            if key not in structured_data:
-                print(f"⚠️ Missing required key: {key}")
+        structured_data, repaired_sections, failed_sections = repair_profile(
+            synthesizer, sections, errors, company_name, website_url, all_sources
+        )
+        if set(failed_sections) == set(PROFILE_SECTIONS):
+            return get_fallback_data(company_name, website_url)
+        
+        validate_profile(structured_data)
+        if not failed_sections:
+            store_synthesis(synthesis_key, structured_data)
+        return attach_metadata(structured_data, company_name, website_url, all_sources, context_stats,
+                               repaired_sections=repaired_sections, failed_sections=failed_sections)
+    
+    return attach_metadata(structured_data, company_name, website_url, all_sources, context_stats)
+
+
+def stream_company_data(company_name, website_url, max_workers=None, synthesis_mode=None):
+    """
+    Streaming variant of get_company_data for progressive rendering.
+
+    synthesis_mode works as in get_company_data; in 'fanout' mode each
+    section is yielded as its own LLM call finishes.
+
+    Yields:
+        (section_name, value) for each top-level profile section as soon as
+        the LLM finishes writing it, then ('complete', structured_data) with
+        the validated profile and _metadata.
+    """
+    with span("stream_company_data", company=company_name) as trace:
+        for key, value in _stream_company(company_name, website_url, max_workers, synthesis_mode):
+            if key == 'complete':
+                value['_metadata']['timings'] = trace.summary()
+            yield key, value
+
+
+def _stream_company(company_name, website_url, max_workers, synthesis_mode):
+    print(f"🕵️ Starting deep research on {company_name}...")
+    
+    inputs, all_sources, context_stats = prepare_research(company_name, website_url, max_workers)
+    
+    synthesizer = get_synthesis_provider()
+    
+    if (synthesis_mode or SYNTHESIS_MODE) == 'fanout':
+        print("🧠 Synthesizing sections in parallel...")
+        structured_data = {}
+        failed_sections = []
+        for key, value in iter_sections(synthesizer, company_name, website_url, all_sources):
+            if value is None:
+                failed_sections.append(key)
                 structured_data[key] = get_default_section(key)
+                continue
+            structured_data[key] = value
+            yield key, value
         
-        # Add metadata
-        structured_data['_metadata'] = {
-            'company_name': company_name,
-            'website': website_url,
-            'sources_count': len(all_sources),
-            'all_sources': all_sources
-        }
+        structured_data = {key: structured_data[key] for key in SECTION_SPECS}
+        failed_sections = [key for key in SECTION_SPECS if key in failed_sections]
+        yield 'complete', attach_metadata(structured_data, company_name, website_url, all_sources,
+                                          context_stats, failed_sections=failed_sections)
+        return
+    
+    synthesis_key, structured_data = lookup_synthesis(synthesizer, inputs)
+    
+    if structured_data is not None:
+        print("💾 Synthesis cache hit - skipping LLM call")
+        for key in PROFILE_SECTIONS:
+            if key in structured_data:
+                yield key, structured_data[key]
+    else:
+        print("🧠 Streaming synthesis...")
+        parser = IncrementalSectionParser()
+        with span("llm:synthesis_stream"):
+            for chunk in synthesizer.stream(SYSTEM_PROMPT, USER_PROMPT, inputs):
+                for key, value in parser.feed(chunk):
+                    yield key, value
+        
+        for key, error in parser.errors.items():
+            print(f"❌ JSON parsing error in {key}: {error}")
         
-        print(f"✅ Research complete - {len(all_sources)} sources analyzed")
-        return structured_data
+        structured_data, repaired_sections, failed_sections = repair_profile(
+            synthesizer, parser.sections, parser.errors, company_name, website_url, all_sources
+        )
+        for key in repaired_sections:
+            yield key, structured_data[key]
         
-    except json.JSONDecodeError as e:
-        print(f"❌ JSON parsing error: {e}")
-        return get_fallback_data(company_name, website_url)
+        if set(failed_sections) == set(PROFILE_SECTIONS):
+            yield 'complete', get_fallback_data(company_name, website_url)
+            return
+        
+        validate_profile(structured_data)
+        if not failed_sections:
+            store_synthesis(synthesis_key, structured_data)
+        yield 'complete', attach_metadata(structured_data, company_name, website_url, all_sources, context_stats,
+                                          repaired_sections=repaired_sections, failed_sections=failed_sections)
+        return
+    
+    yield 'complete', attach_metadata(structured_data, company_name, website_url, all_sources, context_stats)
 
 
 def get_default_section(section_name):
@@ -257,5 +661,6 @@ def get_fallback_data(company_name, website_url):
         'why_now': [{'title': 'Research Needed', 'description': 'Manual check recommended.', 'source_url': website_url}],
         'personas': [{'name': 'Director of Internal Comms', 'role': 'Internal Comms Lead', 'email': 'Unknown', 'is_named_person': False}],
         'angles': [],
-        '_metadata': {'company_name': company_name, 'website': website_url, 'sources_count': 0, 'all_sources': []}
+        '_metadata': {'company_name': company_name, 'website': website_url, 'sources_count': 0, 'all_sources': [],
+                      'fallback': True}
     }
@@ -0,0 +1,235 @@
+"""
+Research Cache - Persistent SQLite store for Tavily search results and
+LLM syntheses
+
+Entries expire individually and each store is capped by entry count,
+evicting the least recently used rows first.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from memory_cache import hash_key
+
+DAY = 24 * 60 * 60
+
+CACHE_DIR = os.environ.get("RESEARCH_CACHE_DIR", ".cache")
+CACHE_DISABLED = os.environ.get("RESEARCH_CACHE_DISABLED", "").lower() in ("1", "true", "yes")
+
+# How long each kind of search stays fresh
+SEARCH_TTLS = {
+    'general': 30 * DAY,
+    'strategy': 3 * DAY,
+    'tech': 14 * DAY,
+    'culture': 14 * DAY,
+    'people_internal': 7 * DAY,
+    'people_corporate': 7 * DAY,
+    'people_linkedin': 7 * DAY,
+}
+DEFAULT_TTL = 1 * DAY
+
+# An empty result list is often a transient failure or rate limit, so it is
+# only remembered briefly (0 = never cache empty results)
+EMPTY_RESULTS_TTL = float(os.environ.get("SEARCH_EMPTY_TTL", 15 * 60))
+
+SEARCH_CACHE_MAX_ENTRIES = int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "5000"))
+
+# Syntheses are content-addressed, so they only age out to bound disk use
+SYNTHESIS_TTL = 90 * DAY
+SYNTHESIS_CACHE_MAX_ENTRIES = int(os.environ.get("SYNTHESIS_CACHE_MAX_ENTRIES", "1000"))
+
+
+def normalize_query(query):
+    """Collapses whitespace and case so cosmetic query edits share a cache entry"""
+    return ' '.join(str(query).split()).lower()
+
+
+class SqliteCache:
+    """
+    Thread-safe key/value store backed by a single SQLite table.
+
+    Values are JSON documents. Every entry carries its own expiry, and
+    `last_access` drives LRU eviction once `max_entries` is exceeded.
+    """
+
+    def __init__(self, path, table, max_entries):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table} (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_lru ON {table} (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        """Returns the cached value, or None on a miss or an expired entry"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute(
+                f"UPDATE {self.table} SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key, value, ttl):
+        """Stores a JSON-serializable value for `ttl` seconds"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                f"""INSERT OR REPLACE INTO {self.table}
+                    (key, value, created_at, expires_at, last_access)
+                    VALUES (?, ?, ?, ?, ?)""",
+                (key, json.dumps(value), now, now + ttl, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                f"""DELETE FROM {self.table} WHERE key IN (
+                    SELECT key FROM {self.table} ORDER BY last_access ASC LIMIT ?
+                )""",
+                (overflow,)
+            )
+            self.evictions += overflow
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': entries,
+            'max_entries': self.max_entries,
+        }
+
+
+class SearchCache(SqliteCache):
+    """Caches raw Tavily result lists keyed on (normalized query, depth, max_results)"""
+
+    def __init__(self, path=None, max_entries=SEARCH_CACHE_MAX_ENTRIES, ttls=None):
+        super().__init__(
+            path or os.path.join(CACHE_DIR, "research_cache.sqlite3"),
+            "search_results",
+            max_entries
+        )
+        self.ttls = dict(SEARCH_TTLS if ttls is None else ttls)
+
+    @staticmethod
+    def make_key(query, search_depth, max_results):
+        return hash_key(normalize_query(query), search_depth, max_results)
+
+    def get_results(self, query, search_depth, max_results):
+        return self.get(self.make_key(query, search_depth, max_results))
+
+    def put_results(self, query_type, query, search_depth, max_results, results):
+        ttl = self.ttls.get(query_type, DEFAULT_TTL)
+        if not results:
+            if EMPTY_RESULTS_TTL <= 0:
+                return
+            ttl = min(ttl, EMPTY_RESULTS_TTL)
+        self.put(self.make_key(query, search_depth, max_results), results, ttl)
+
+
+class SynthesisCache(SqliteCache):
+    """Caches parsed structured_data keyed on a hash of everything sent to the LLM"""
+
+    def __init__(self, path=None, max_entries=SYNTHESIS_CACHE_MAX_ENTRIES, ttl=SYNTHESIS_TTL):
+        super().__init__(
+            path or os.path.join(CACHE_DIR, "research_cache.sqlite3"),
+            "syntheses",
+            max_entries
+        )
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(system_prompt, model_name, rendered_inputs):
+        return hash_key(system_prompt, model_name, rendered_inputs)
+
+    def put_profile(self, key, structured_data):
+        """Stores a parsed profile, leaving out per-run _metadata"""
+        profile = {k: v for k, v in structured_data.items() if k != '_metadata'}
+        self.put(key, profile, self.ttl)
+
+
+_search_cache = None
+_synthesis_cache = None
+_cache_lock = threading.Lock()
+_caches_enabled = True
+
+
+def set_caches_enabled(enabled):
+    """
+    Turns the shared caches on or off at runtime (e.g. while recording
+    cassettes, where every call must reach the provider).
+
+    Returns:
+        The previous setting, so callers can restore it
+    """
+    global _caches_enabled
+    with _cache_lock:
+        previous, _caches_enabled = _caches_enabled, bool(enabled)
+    return previous
+
+
+def get_search_cache():
+    """Returns the shared SearchCache, or None when caching is disabled"""
+    global _search_cache
+    if CACHE_DISABLED or not _caches_enabled:
+        return None
+    with _cache_lock:
+        if _search_cache is None:
+            _search_cache = SearchCache()
+    return _search_cache
+
+
+def get_synthesis_cache():
+    """Returns the shared SynthesisCache, or None when caching is disabled"""
+    global _synthesis_cache
+    if CACHE_DISABLED or not _caches_enabled:
+        return None
+    with _cache_lock:
+        if _synthesis_cache is None:
+            _synthesis_cache = SynthesisCache()
+    return _synthesis_cache
@@ -4,6 +4,38 @@ Workshop Features Database - Maps pain points to specific platform capabilities
 Save this file as: workshop_features.py in your project root directory
 """
 
+import os
+import re
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from bisect import bisect_right
+
+from instrumentation import span
+from memory_cache import LRUCache, hash_key
+
+try:
+    import numpy as np
+    MATRIX_AVAILABLE = True
+except ImportError:
+    MATRIX_AVAILABLE = False
+    print("⚠️ numpy not installed - batch feature scoring uses pure Python")
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+# 'keyword' (+1 per pain point found) or 'bm25' (weighted relevance over
+# each feature's name, features and pain points)
+FEATURE_MATCH_MODE = os.environ.get("FEATURE_MATCH_MODE", "keyword")
+
+# Profiles whose match results are memoized (0 disables the cache)
+FEATURE_MATCH_CACHE_SIZE = int(os.environ.get("FEATURE_MATCH_CACHE_SIZE", "256"))
+
 WORKSHOP_FEATURES = {
     # Core platform capabilities organized by use case
     'leadership_communication': {
@@ -157,18 +189,453 @@ WORKSHOP_FEATURES = {
 }
 
 
-def match_features_to_company(structured_data):
+# --- KEYWORD MATCHER ---
+
+class KeywordMatcher:
     """
-    Analyzes company data and returns top 3-4 most relevant Workshop features.
-    
-    Args:
-        structured_data: Company research data
-        
+    Finds every catalog pain-point keyword in a text in one regex pass.
+
+    Keywords must start on a word boundary (so 'sso' no longer matches inside
+    'association') but may run into a longer word, as plain substring
+    matching did ('remote' still matches 'remotely', 'scale' 'scaled').
+    Overlapping keywords are all reported: the scan runs as a lookahead at
+    every word start, and longer keywords also credit the shorter keywords
+    they begin with ('engagement metrics' implies 'engagement').
+    """
+
+    def __init__(self, catalog):
+        self.feature_keys = list(catalog)
+        self.keyword_features = {}
+        for feature_key, feature_data in catalog.items():
+            for position, keyword in enumerate(feature_data['pain_points']):
+                self.keyword_features.setdefault(keyword, []).append((feature_key, position))
+
+        self.keywords = sorted(self.keyword_features, key=len, reverse=True)
+        self.keyword_index = {keyword: i for i, keyword in enumerate(self.keywords)}
+        alternation = '|'.join(re.escape(k) for k in self.keywords)
+        self.pattern = re.compile(
+            rf"(?<![a-z0-9])(?=({alternation}))"
+        ) if self.keywords else None
+
+        # Shorter keywords that a longer keyword starts with
+        self.implied = {
+            keyword: [
+                other for other in self.keywords
+                if other != keyword and keyword.startswith(other)
+            ]
+            for keyword in self.keywords
+        }
+
+        # keywords x features incidence, for turning keyword hits into scores
+        self.incidence = None
+        if MATRIX_AVAILABLE:
+            feature_index = {key: j for j, key in enumerate(self.feature_keys)}
+            self.incidence = np.zeros((len(self.keywords), len(self.feature_keys)))
+            for keyword, owners in self.keyword_features.items():
+                for feature_key, _ in owners:
+                    self.incidence[self.keyword_index[keyword], feature_index[feature_key]] = 1
+
+    def find_keywords_batch(self, texts):
+        """
+        Scans many lowercase texts in a single pass.
+
+        Returns:
+            One set of distinct keywords per text
+        """
+        found = [set() for _ in texts]
+        if self.pattern is None or not texts:
+            return found
+        # Newline separators are non-word characters, so no hit spans two texts
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + 1
+        for match in self.pattern.finditer('\n'.join(texts)):
+            keyword = match.group(1)
+            hits = found[bisect_right(starts, match.start()) - 1]
+            if keyword not in hits:
+                hits.add(keyword)
+                hits.update(self.implied[keyword])
+        return found
+
+    def find_keywords(self, text):
+        """Returns the set of distinct keywords present in lowercase `text`"""
+        return self.find_keywords_batch([text])[0]
+
+    def group_by_feature(self, keywords):
+        """Maps found keywords to {feature_key: [keywords in catalog order]}"""
+        hits = {}
+        for keyword in keywords:
+            for feature_key, position in self.keyword_features[keyword]:
+                hits.setdefault(feature_key, []).append((position, keyword))
+        return {key: [kw for _, kw in sorted(found)] for key, found in hits.items()}
+
+    def match(self, text):
+        """
+        Returns {feature_key: [matched keywords in catalog order]} for every
+        feature with at least one hit.
+        """
+        return self.group_by_feature(self.find_keywords(text))
+
+    def score_matrix(self, keyword_sets):
+        """accounts x features matrix of distinct-keyword hit counts (needs numpy)"""
+        hits = np.zeros((len(keyword_sets), len(self.keywords)))
+        for row, keywords in enumerate(keyword_sets):
+            hits[row, [self.keyword_index[k] for k in keywords]] = 1
+        return hits @ self.incidence
+
+
+# --- BM25 RELEVANCE ENGINE ---
+
+FIELD_WEIGHTS = {'name': 1.5, 'features': 1.0, 'pain_points': 2.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+]*")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in into is it its of on or "
+    "our that the their this to was we were with you your".split()
+)
+
+
+def tokenize(text):
+    """Lowercase word tokens with stopwords dropped and a plural 's' stripped"""
+    tokens = []
+    for token in _TOKEN_RE.findall(str(text).lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    """
+    Sparse BM25 index over the catalog, with each feature as one document.
+
+    Term weights are stored column-wise (an inverted index in CSC layout:
+    `indptr`, `doc_ids`, `weights`) with the BM25 saturation and idf already
+    applied. Scoring a company costs only the postings of the terms it
+    contains, so it stays fast with thousands of catalog entries.
+    """
+
+    def __init__(self, catalog, field_weights=None):
+        field_weights = field_weights or FIELD_WEIGHTS
+        self.feature_keys = list(catalog)
+        n_docs = len(self.feature_keys)
+
+        doc_terms = []
+        doc_lengths = np.zeros(n_docs)
+        for i, feature_data in enumerate(catalog.values()):
+            counts = {}
+            for field, weight in field_weights.items():
+                value = feature_data.get(field, '')
+                texts = value if isinstance(value, list) else [value]
+                for token in tokenize(' '.join(map(str, texts))):
+                    counts[token] = counts.get(token, 0.0) + weight
+            doc_terms.append(counts)
+            doc_lengths[i] = sum(counts.values())
+
+        postings = {}
+        for i, counts in enumerate(doc_terms):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((i, tf))
+
+        avg_len = doc_lengths.mean() if n_docs and doc_lengths.mean() > 0 else 1.0
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * doc_lengths / avg_len)
+
+        self.vocab = {}
+        indptr = [0]
+        doc_ids, weights = [], []
+        for term, entries in postings.items():
+            self.vocab[term] = len(self.vocab)
+            idf = np.log1p((n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            for i, tf in entries:
+                doc_ids.append(i)
+                weights.append(idf * tf * (BM25_K1 + 1) / (tf + norm[i]))
+            indptr.append(len(doc_ids))
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.doc_ids = np.asarray(doc_ids, dtype=np.int64)
+        self.weights = np.asarray(weights, dtype=float)
+        self.terms = list(self.vocab)
+
+    def to_arrays(self):
+        """The index as plain arrays, for saving with np.savez"""
+        return {
+            'bm25_terms': np.asarray(self.terms, dtype=str),
+            'bm25_indptr': self.indptr,
+            'bm25_doc_ids': self.doc_ids,
+            'bm25_weights': self.weights,
+        }
+
+    @classmethod
+    def from_arrays(cls, feature_keys, arrays):
+        """Rebuilds an index from to_arrays() output without re-tokenizing the catalog"""
+        index = cls.__new__(cls)
+        index.feature_keys = list(feature_keys)
+        index.terms = [str(t) for t in arrays['bm25_terms']]
+        index.vocab = {term: i for i, term in enumerate(index.terms)}
+        index.indptr = np.asarray(arrays['bm25_indptr'], dtype=np.int64)
+        index.doc_ids = np.asarray(arrays['bm25_doc_ids'], dtype=np.int64)
+        index.weights = np.asarray(arrays['bm25_weights'], dtype=float)
+        if len(index.indptr) != len(index.terms) + 1:
+            raise ValueError("BM25 arrays do not match their vocabulary")
+        return index
+
+    def query_terms(self, text):
+        """Distinct indexed term ids present in `text`"""
+        return sorted({self.vocab[t] for t in tokenize(text) if t in self.vocab})
+
+    def score_batch(self, texts):
+        """accounts x features matrix of BM25 scores"""
+        scores = np.zeros((len(texts), len(self.feature_keys)))
+        for row, text in enumerate(texts):
+            term_ids = self.query_terms(text)
+            if not term_ids:
+                continue
+            starts, ends = self.indptr[term_ids], self.indptr[np.add(term_ids, 1)]
+            positions = np.concatenate([np.arange(a, b) for a, b in zip(starts, ends)])
+            np.add.at(scores[row], self.doc_ids[positions], self.weights[positions])
+        return scores
+
+    def matched_terms(self, text, feature_index, limit=5):
+        """The query terms that contributed most to one feature's score"""
+        contributions = []
+        for term_id in self.query_terms(text):
+            lo, hi = self.indptr[term_id], self.indptr[term_id + 1]
+            hit = np.flatnonzero(self.doc_ids[lo:hi] == feature_index)
+            if hit.size:
+                contributions.append((-self.weights[lo + hit[0]], self.terms[term_id]))
+        return [term for _, term in sorted(contributions)[:limit]]
+
+
+# --- CATALOG ---
+
+# Optional YAML/JSON file that replaces the built-in WORKSHOP_FEATURES dict.
+# Its parsed entries and BM25 arrays are cached beside it as <file>.idx (a
+# numpy .npz, loaded without pickle) and reused until the file's content or
+# this module changes; long-running processes re-check the file at most
+# every CATALOG_RELOAD_INTERVAL seconds and pick up edits without a restart.
+CATALOG_PATH = os.environ.get("WORKSHOP_FEATURES_PATH")
+CATALOG_RELOAD_INTERVAL = float(os.environ.get("CATALOG_RELOAD_INTERVAL", 2))
+CATALOG_INDEX_VERSION = 2
+CATALOG_INDEX_SUFFIX = '.idx'
+REQUIRED_FEATURE_FIELDS = ('name', 'features', 'pain_points', 'tier')
+
+
+class CompiledCatalog:
+    """A feature catalog with its keyword matcher and BM25 index built"""
+
+    def __init__(self, features, source=None, content_hash=None, bm25=None):
+        self.features = validate_catalog(features)
+        self.feature_keys = list(self.features)
+        self.source = source
+        self.content_hash = content_hash
+        self.matcher = KeywordMatcher(self.features)
+        if bm25 is None and MATRIX_AVAILABLE:
+            bm25 = BM25Index(self.features)
+        self.bm25 = bm25
+
+
+def validate_catalog(features):
+    """Checks every entry has the fields matching relies on; lowercases pain points"""
+    if not isinstance(features, dict) or not features:
+        raise ValueError("Feature catalog must be a non-empty mapping of feature key -> entry")
+    validated = {}
+    for key, entry in features.items():
+        if not isinstance(entry, dict):
+            raise ValueError(f"Feature '{key}' must be a mapping")
+        missing = [field for field in REQUIRED_FEATURE_FIELDS if field not in entry]
+        if missing:
+            raise ValueError(f"Feature '{key}' is missing: {', '.join(missing)}")
+        validated[str(key)] = {
+            **entry,
+            'features': [str(f) for f in entry['features']],
+            'pain_points': [str(p).lower() for p in entry['pain_points']],
+        }
+    return validated
+
+
+def parse_catalog(path, raw):
+    """Decodes catalog file bytes as YAML (.yaml/.yml) or JSON"""
+    text = raw.decode('utf-8')
+    if path.lower().endswith(('.yaml', '.yml')):
+        if not YAML_AVAILABLE:
+            raise ImportError("pyyaml is required to load a YAML feature catalog")
+        features = yaml.safe_load(text)
+    else:
+        features = json.loads(text)
+    return features
+
+
+def _source_hash():
+    try:
+        with open(__file__, 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+_SOURCE_HASH = _source_hash()
+
+
+def _catalog_hash(raw):
+    """Content hash that also changes when this module or its index settings change"""
+    settings = json.dumps([CATALOG_INDEX_VERSION, _SOURCE_HASH, FIELD_WEIGHTS, BM25_K1, BM25_B])
+    return hashlib.sha256(settings.encode('utf-8') + raw).hexdigest()
+
+
+def read_catalog_index(index_path, content_hash):
+    """
+    Loads a cached index written by write_catalog_index.
+
     Returns:
-        List of matched feature dictionaries
+        (features, bm25) or None if the index is missing or stale
     """
-    
-    # Extract text to analyze
+    with np.load(index_path, allow_pickle=False) as data:
+        if str(data['hash']) != content_hash:
+            return None
+        features = json.loads(str(data['features']))
+        bm25 = BM25Index.from_arrays(features, data)
+    return features, bm25
+
+
+def write_catalog_index(index_path, catalog):
+    """Saves the validated entries and BM25 arrays as plain data (no pickle)"""
+    # A uniquely named temp file, so processes loading the same catalog at
+    # once never interleave writes before the rename
+    with tempfile.NamedTemporaryFile(dir=os.path.dirname(index_path) or '.', suffix='.tmp',
+                                     prefix=os.path.basename(index_path) + '.', delete=False) as f:
+        tmp_path = f.name
+        try:
+            np.savez(f, hash=np.asarray(catalog.content_hash),
+                     features=np.asarray(json.dumps(catalog.features)),
+                     **catalog.bm25.to_arrays())
+        except BaseException:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, index_path)
+
+
+def load_catalog(path):
+    """
+    Loads a catalog file, reusing its cached compiled index when the content
+    hash matches and rebuilding (and re-caching) it otherwise.
+
+    Returns:
+        CompiledCatalog
+    """
+    with open(path, 'rb') as f:
+        raw = f.read()
+    content_hash = _catalog_hash(raw)
+    if not MATRIX_AVAILABLE:
+        # Nothing costly to cache without the BM25 index
+        return CompiledCatalog(parse_catalog(path, raw), source=path, content_hash=content_hash)
+    index_path = path + CATALOG_INDEX_SUFFIX
+
+    try:
+        cached = read_catalog_index(index_path, content_hash)
+        if cached is not None:
+            features, bm25 = cached
+            return CompiledCatalog(features, source=path, content_hash=content_hash, bm25=bm25)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable catalog index {index_path}: {e}")
+
+    catalog = CompiledCatalog(parse_catalog(path, raw), source=path, content_hash=content_hash)
+    try:
+        write_catalog_index(index_path, catalog)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"⚠️ Could not cache catalog index: {e}")
+    return catalog
+
+
+def save_catalog(path, features=None):
+    """Writes a catalog (default: the built-in one) as YAML or JSON to start a catalog file"""
+    features = features if features is not None else WORKSHOP_FEATURES
+    with open(path, 'w', encoding='utf-8') as f:
+        if path.lower().endswith(('.yaml', '.yml')):
+            if not YAML_AVAILABLE:
+                raise ImportError("pyyaml is required to write a YAML feature catalog")
+            yaml.safe_dump(features, f, sort_keys=False, allow_unicode=True)
+        else:
+            json.dump(features, f, indent=2)
+
+
+_builtin_catalog = CompiledCatalog(WORKSHOP_FEATURES)
+_catalog = None
+_catalog_signature = None
+_catalog_checked_at = 0.0
+_catalog_lock = threading.Lock()
+
+
+def get_catalog():
+    """
+    Returns the active CompiledCatalog.
+
+    With CATALOG_PATH set, the file is stat'ed at most once per
+    CATALOG_RELOAD_INTERVAL and reloaded when it changes. A file that fails
+    to load keeps the previous catalog in service.
+    """
+    global _catalog, _catalog_signature, _catalog_checked_at
+    path = CATALOG_PATH
+    if not path:
+        return _builtin_catalog
+    if _catalog is not None and time.monotonic() - _catalog_checked_at < CATALOG_RELOAD_INTERVAL:
+        return _catalog
+
+    with _catalog_lock:
+        if _catalog is not None and time.monotonic() - _catalog_checked_at < CATALOG_RELOAD_INTERVAL:
+            return _catalog
+        try:
+            st = os.stat(path)
+            signature = (path, st.st_mtime_ns, st.st_size)
+        except OSError:
+            signature = (path, None, None)
+        if signature != _catalog_signature:
+            # Remember the signature even on failure so a bad edit warns once
+            _catalog_signature = signature
+            try:
+                catalog = load_catalog(path)
+                if _catalog is not None and catalog.content_hash != _catalog.content_hash:
+                    print(f"🔄 Reloaded feature catalog from {path} ({len(catalog.feature_keys)} features)")
+                _catalog = catalog
+            except Exception as e:
+                print(f"⚠️ Feature catalog {path} not loaded: {e}")
+        if _catalog is None:
+            _catalog = _builtin_catalog
+        _catalog_checked_at = time.monotonic()
+        return _catalog
+
+
+def set_catalog_path(path):
+    """Switches to a catalog file (None for the built-in catalog); returns the previous path"""
+    global CATALOG_PATH, _catalog, _catalog_signature
+    with _catalog_lock:
+        previous = CATALOG_PATH
+        CATALOG_PATH = path
+        _catalog = None
+        _catalog_signature = None
+    return previous
+
+
+def resolve_match_mode(mode=None):
+    """Validates a feature-match mode, falling back to keyword scoring without numpy"""
+    mode = (mode or FEATURE_MATCH_MODE).lower()
+    if mode not in ('keyword', 'bm25'):
+        raise ValueError(f"Unknown feature match mode: {mode}")
+    if mode == 'bm25' and not MATRIX_AVAILABLE:
+        print("⚠️ numpy not installed - using keyword feature matching")
+        return 'keyword'
+    return mode
+
+
+def extract_company_text(structured_data):
+    """Lowercased text from the profile fields that feature matching reads"""
     text_to_analyze = []
     
     # Add snapshot data
@@ -207,42 +674,227 @@ def match_features_to_company(structured_data):
                 text_to_analyze.append(str(fear).lower())
     
     # Combine all text
-    combined_text = ' '.join(text_to_analyze)
+    return ' '.join(text_to_analyze)
+
+
+def score_accounts(profiles, mode=None):
+    """
+    Scores many company profiles against the feature catalog at once.
+
+    Args:
+        profiles: List of structured_data dicts
+        mode: 'keyword' or 'bm25' (defaults to FEATURE_MATCH_MODE)
+
+    Returns:
+        (scores, details) - scores is an accounts x features matrix (columns
+        follow get_catalog().feature_keys; a numpy array, or nested lists without numpy)
+        of distinct pain points found or BM25 relevance; details holds one
+        {feature_key: matched_keywords} dict per account
+    """
+    scores, details, _ = _score(get_catalog(), profiles, resolve_match_mode(mode))
+    return scores, details
+
+
+def _score(catalog, profiles, mode):
+    texts = [extract_company_text(p) for p in profiles]
+    keyword_sets = catalog.matcher.find_keywords_batch(texts)
+    details = [catalog.matcher.group_by_feature(keywords) for keywords in keyword_sets]
+    if mode == 'bm25':
+        scores = catalog.bm25.score_batch(texts)
+    elif MATRIX_AVAILABLE:
+        scores = catalog.matcher.score_matrix(keyword_sets)
+    else:
+        scores = [[len(d.get(key, [])) for key in catalog.feature_keys] for d in details]
+    return scores, details, texts
+
+
+def top_k_features(scores, k=4):
+    """
+    Ranks features per account by score (catalog order breaks ties).
+
+    Returns:
+        One list of column indices per account, best first, zero scores dropped
+    """
+    if len(scores) == 0:
+        return []
+    if MATRIX_AVAILABLE:
+        scores = np.asarray(scores, dtype=float)
+        ranked = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return [[int(j) for j in row if scores[i, j] > 0] for i, row in enumerate(ranked)]
+    return [
+        [j for j in sorted(range(len(row)), key=lambda j: -row[j])[:k] if row[j] > 0]
+        for row in scores
+    ]
+
+
+def match_features_batch(profiles, top_k=4, mode=None):
+    """
+    Returns the top matched features for each profile.
+
+    Args:
+        profiles: List of structured_data dicts
+        top_k: Features to keep per account
+        mode: 'keyword' or 'bm25' (defaults to FEATURE_MATCH_MODE)
+
+    Returns:
+        One list of matched feature dictionaries per profile
+    """
+    with span("feature_match_batch", accounts=len(profiles)):
+        return _match_batch(profiles, top_k, resolve_match_mode(mode))
+
+
+def _match_batch(profiles, top_k, mode):
+    catalog = get_catalog()
+    scores, details, texts = _score(catalog, profiles, mode)
+    results = []
+    for i, ranked in enumerate(top_k_features(scores, top_k)):
+        top_features = []
+        for j in ranked:
+            feature_key = catalog.feature_keys[j]
+            feature_data = catalog.features[feature_key]
+            matched = details[i].get(feature_key, [])
+            if mode == 'bm25':
+                relevance = round(float(scores[i][j]), 3)
+                matched = matched or catalog.bm25.matched_terms(texts[i], j)
+            else:
+                relevance = len(matched)
+            top_features.append({
+                'key': feature_key,
+                'name': feature_data['name'],
+                'features': feature_data['features'],
+                'tier': feature_data['tier'],
+                'relevance_score': relevance,
+                'matched_keywords': matched
+            })
+        results.append(top_features)
+    return results
+
+
+def match_features_to_company(structured_data, mode=None):
+    """
+    Analyzes company data and returns top 3-4 most relevant Workshop features.
     
-    # Score each feature
-    feature_scores = {}
-    for feature_key, feature_data in WORKSHOP_FEATURES.items():
-        score = 0
-        matched_keywords = []
-        
-        for pain_point in feature_data['pain_points']:
-            if pain_point in combined_text:
-                score += 1
-                matched_keywords.append(pain_point)
+    Args:
+        structured_data: Company research data
+        mode: 'keyword' or 'bm25' (defaults to FEATURE_MATCH_MODE)
         
-        if score > 0:
-            feature_scores[feature_key] = {
-                'score': score,
-                'data': feature_data,
-                'matched_keywords': matched_keywords
-            }
-    
-    # Sort by score and return top matches
-    sorted_features = sorted(feature_scores.items(), key=lambda x: x[1]['score'], reverse=True)
-    
-    # Return top 3-4 features
-    top_features = []
-    for feature_key, feature_info in sorted_features[:4]:
-        top_features.append({
-            'key': feature_key,
-            'name': feature_info['data']['name'],
-            'features': feature_info['data']['features'],
-            'tier': feature_info['data']['tier'],
-            'relevance_score': feature_info['score'],
-            'matched_keywords': feature_info['matched_keywords']
-        })
-    
-    return top_features
+    Returns:
+        List of matched feature dictionaries
+    """
+    with span("feature_match"):
+        mode = resolve_match_mode(mode)
+        catalog = get_catalog()
+        key = profile_match_key(structured_data, mode, catalog)
+        matches = _match_cache.get(key)
+        if matches is None:
+            matches = _match_batch([structured_data], 4, mode)[0]
+            _match_cache.put(key, matches)
+        return [dict(m) for m in matches]
+
+
+# --- MATCH MEMOIZATION ---
+
+_match_cache = LRUCache(max_entries=FEATURE_MATCH_CACHE_SIZE)
+
+
+def profile_match_key(structured_data, mode, catalog):
+    """
+    Hashes only the fields feature matching reads (snapshot, why_now,
+    personas), so metadata or opener edits still hit the cache. The mode and
+    catalog version are included so a catalog reload never serves stale matches.
+    """
+    return hash_key(
+        mode,
+        catalog.content_hash or 'builtin',
+        structured_data.get('snapshot', {}),
+        structured_data.get('why_now', []),
+        structured_data.get('personas', []),
+    )
+
+
+def feature_match_cache_stats():
+    """Hit/miss/eviction counts for the match_features_to_company memo"""
+    return _match_cache.stats()
+
+
+def clear_feature_match_cache():
+    _match_cache.clear()
+
+
+# --- COMPETITOR DISPLACEMENT ---
+
+# Lower priority number = stronger displacement story, shown first
+COMPETITOR_DISPLACEMENTS = [
+    {'tool': 'outlook', 'priority': 1,
+     'message': 'Replace basic Outlook emails with purpose-built internal comms platform'},
+    {'tool': 'sharepoint', 'priority': 2,
+     'message': 'Move beyond SharePoint intranet to engaging, measurable employee communications'},
+    {'tool': 'teams', 'priority': 3,
+     'message': 'Complement Microsoft Teams chat with structured, archived company-wide announcements'},
+    {'tool': 'slack', 'priority': 4,
+     'message': 'Enhance Slack with formal communications that reach all employees reliably'},
+    {'tool': 'gmail', 'priority': 5,
+     'message': 'Upgrade from basic Gmail to professional internal communications platform'},
+    {'tool': 'mailchimp', 'priority': 6,
+     'message': 'Replace marketing tools with employee-specific communication platform'},
+    {'tool': 'constant contact', 'priority': 7,
+     'message': 'Replace marketing tools with employee-specific communication platform'},
+]
+
+_DISPLACEMENT_BY_TOOL = {entry['tool']: entry for entry in COMPETITOR_DISPLACEMENTS}
+# Tools must start on a word boundary but, like the pain-point matcher, may
+# run into a longer word ('outlook365', 'slackbot' still match)
+_DISPLACEMENT_RE = re.compile(
+    r"(?<![a-z0-9])("
+    + '|'.join(re.escape(tool).replace(r'\ ', r'\s+') for tool in sorted(_DISPLACEMENT_BY_TOOL, key=len, reverse=True))
+    + r")"
+)
+
+
+def _tech_stack_text(tech_stack):
+    tech_lower = [str(t).lower() if isinstance(t, str) else str(t.get('tool', '')).lower()
+                  for t in tech_stack or []]
+    return ' '.join(tech_lower)
+
+
+def find_displacements_batch(tech_stacks):
+    """
+    Finds every displaceable tool in many accounts' tech stacks in one pass.
+
+    Args:
+        tech_stacks: List of tech_stack lists (strings or {tool, ...} dicts)
+
+    Returns:
+        One list per account of {tool, priority, message} dicts, best first.
+        Tools sharing a message (e.g. Mailchimp and Constant Contact) are
+        reported once, under the higher-priority tool.
+    """
+    texts = [_tech_stack_text(stack) for stack in tech_stacks]
+    starts = []
+    offset = 0
+    for text in texts:
+        starts.append(offset)
+        offset += len(text) + 1
+
+    found = [set() for _ in texts]
+    for match in _DISPLACEMENT_RE.finditer('\n'.join(texts)):
+        tool = ' '.join(match.group(1).split())
+        found[bisect_right(starts, match.start()) - 1].add(tool)
+
+    results = []
+    for tools in found:
+        ranked, seen_messages = [], set()
+        for entry in sorted((_DISPLACEMENT_BY_TOOL[t] for t in tools), key=lambda e: e['priority']):
+            if entry['message'] not in seen_messages:
+                seen_messages.add(entry['message'])
+                ranked.append(dict(entry))
+        results.append(ranked)
+    return results
+
+
+def find_displacements(tech_stack):
+    """Every displacement angle for one tech stack, highest priority first"""
+    return find_displacements_batch([tech_stack])[0]
 
 
 def get_competitor_displacement_angle(tech_stack):
@@ -253,28 +905,9 @@ def get_competitor_displacement_angle(tech_stack):
         tech_stack: List of current tools
         
     Returns:
-        String with displacement angle or None
+        String with the highest-priority displacement angle or None
     """
-    
-    displacement_messages = {
-        'outlook': 'Replace basic Outlook emails with purpose-built internal comms platform',
-        'sharepoint': 'Move beyond SharePoint intranet to engaging, measurable employee communications',
-        'teams': 'Complement Microsoft Teams chat with structured, archived company-wide announcements',
-        'slack': 'Enhance Slack with formal communications that reach all employees reliably',
-        'gmail': 'Upgrade from basic Gmail to professional internal communications platform',
-        'mailchimp': 'Replace marketing tools with employee-specific communication platform',
-        'constant contact': 'Replace marketing tools with employee-specific communication platform'
-    }
-    
     if not tech_stack:
         return None
-    
-    tech_lower = [str(t).lower() if isinstance(t, str) else str(t.get('tool', '')).lower() 
-                  for t in tech_stack]
-    combined = ' '.join(tech_lower)
-    
-    for tool, message in displacement_messages.items():
-        if tool in combined:
-            return message
-    
-    return None
+    displacements = find_displacements(tech_stack)
+    return displacements[0]['message'] if displacements else None